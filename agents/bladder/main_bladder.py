@@ -4,25 +4,53 @@ FastAPI wrapper for DR_BLADDER_CLI logic
 Port: 8001
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any, Union
 import logging
+import os
 import uvicorn
 
 # 기존 DR_BLADDER_CLI 로직 임포트
-from bladder_logic import analyze_bladder_question
+from bladder_logic import get_analyzer
+from agents.shared.domain_analyzer import AnalysisError
+from agents.shared.request_batcher import RequestBatcher
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+async def _answer_question(question: str) -> str:
+    """병합기가 호출하는 단일 질문 처리 함수"""
+    return await get_analyzer().aanalyze_question(question)
+
+# 처리 중인 같은 질문의 /ask 요청 병합
+batcher = RequestBatcher(_answer_question)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """앱 시작/종료 시 분석기·모델 준비 및 요청 병합기 관리"""
+    # 분석기와 벡터 인덱스를 미리 로드해 첫 요청 지연 방지
+    analyzer = get_analyzer()
+    if analyzer.vector_db:
+        analyzer.vector_db.warm_up()
+    # Ollama 모델을 메모리에 올려 첫 /ask 요청의 모델 로딩 지연 제거
+    await analyzer.warm_up_model()
+    
+    await batcher.start()
+    yield
+    await batcher.stop()
+
 # FastAPI 앱 초기화
 app = FastAPI(
     title="DR_BLADDER API",
     description="Bladder Cancer Medical AI Assistant API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS 설정 (n8n 연동용)
@@ -66,8 +94,7 @@ async def health_check() -> HealthResponse:
     """헬스체크 엔드포인트"""
     try:
         # Ollama 연결 테스트
-        from bladder_logic import BladderAnalyzer
-        analyzer = BladderAnalyzer()
+        analyzer = get_analyzer()
         
         if analyzer.validate_ollama_connection():
             return HealthResponse(
@@ -82,20 +109,33 @@ async def health_check() -> HealthResponse:
                 message="Service is running but Ollama connection failed"
             )
     except Exception as e:
-        logger.error(f"Health check failed: {e}")
+        logger.error("Health check failed: %s", e)
         return HealthResponse(
             status="unhealthy",
             agent="DR_BLADDER",
             message=f"Health check failed: {str(e)}"
         )
 
+async def _to_sse(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """응답 조각을 Server-Sent Events 형식으로 변환 (생성 실패 시 event: error로 종료)"""
+    try:
+        async for chunk in chunks:
+            # SSE 규격: 여러 줄 데이터는 각 줄마다 "data: " 접두사 필요
+            yield "data: " + chunk.replace("\n", "\ndata: ") + "\n\n"
+    except AnalysisError as e:
+        logger.error("Streaming response failed: %s", e)
+        yield "event: error\ndata: " + str(e).replace("\n", "\ndata: ") + "\n\n"
+        return
+    yield "event: end\ndata: \n\n"
+
 @app.post("/ask", response_model=AnswerResponse)
-async def ask_question(request: QuestionRequest) -> AnswerResponse:
+async def ask_question(request: QuestionRequest, stream: bool = False) -> Union[AnswerResponse, StreamingResponse]:
     """
     방광암 관련 질문 처리 엔드포인트
     
     Args:
         request: 질문 요청 객체
+        stream: True이면 토큰 단위로 text/event-stream 스트리밍 응답
         
     Returns:
         DR_BLADDER의 응답
@@ -105,10 +145,17 @@ async def ask_question(request: QuestionRequest) -> AnswerResponse:
         if not request.question or not request.question.strip():
             raise HTTPException(status_code=400, detail="Question cannot be empty")
         
-        logger.info(f"Received question: {request.question[:100]}...")
+        logger.info("Received question: %s...", request.question[:100])
+        
+        analyzer = get_analyzer()
+        
+        if stream:
+            return StreamingResponse(
+                _to_sse(analyzer.stream_question(request.question)),
+                media_type="text/event-stream"
+            )
         
-        # 기존 DR_BLADDER_CLI 로직 호출 (100% 동일한 동작)
-        answer = analyze_bladder_question(request.question)
+        answer = await batcher.submit(request.question)
         
         logger.info("Successfully generated response")
         
@@ -119,31 +166,38 @@ async def ask_question(request: QuestionRequest) -> AnswerResponse:
         
     except HTTPException:
         raise
+    except AnalysisError as e:
+        # Ollama 생성 실패는 정상 답변이 아닌 업스트림 오류로 반환
+        logger.error("Answer generation failed: %s", e)
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
-        logger.error(f"Error processing question: {e}")
+        logger.error("Error processing question: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @app.get("/model-info")
 async def get_model_info() -> Dict[str, Any]:
     """모델 정보 조회 엔드포인트"""
     try:
-        from bladder_logic import BladderAnalyzer
-        analyzer = BladderAnalyzer()
+        analyzer = get_analyzer()
         return {
             "agent": "DR_BLADDER",
             "model": analyzer.get_model_info()
         }
     except Exception as e:
-        logger.error(f"Failed to get model info: {e}")
+        logger.error("Failed to get model info: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to get model info: {str(e)}")
 
 # 서버 실행 코드
 if __name__ == "__main__":
-    # uvicorn main_bladder:app --reload --port 8001
+    # 개발용: uvicorn main_bladder:app --reload --port 8001
+    # 운영: 멀티 워커 + uvloop/httptools (설치된 경우 "auto"가 선택)
     uvicorn.run(
         "main_bladder:app",
         host="0.0.0.0",
         port=8001,
-        reload=True,
+        workers=int(os.getenv("WEB_CONCURRENCY", 2)),
+        loop="auto",
+        http="auto",
+        reload=False,
         log_level="info"
     )
\ No newline at end of file
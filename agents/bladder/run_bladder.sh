@@ -3,4 +3,5 @@
 
 echo "Starting DR_BLADDER API on port 8001..."
 cd "$(dirname "$0")"
+export PYTHONPATH="$(cd ../.. && pwd)${PYTHONPATH:+:$PYTHONPATH}"
 uvicorn main_bladder:app --reload --port 8001 --host 0.0.0.0
\ No newline at end of file
@@ -3,4 +3,5 @@
 
 echo "Starting DR_PROSTATE API on port 8002..."
 cd "$(dirname "$0")"
+export PYTHONPATH="$(cd ../.. && pwd)${PYTHONPATH:+:$PYTHONPATH}"
 uvicorn main_prostate:app --reload --port 8002 --host 0.0.0.0
\ No newline at end of file
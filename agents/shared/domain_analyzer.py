@@ -0,0 +1,444 @@
+"""
+Domain Analyzer - Shared Core Logic
+DR_BLADDER / DR_PROSTATE 공통 의료 질문 분석 및 응답 생성
+"""
+
+import asyncio
+import ollama
+import logging
+import os
+import threading
+from functools import lru_cache
+from types import MappingProxyType
+from typing import AsyncIterator, Dict, Any, List, Optional, Pattern, Tuple, Type
+
+from cachetools import TTLCache
+
+from agents.shared.vector_db import get_vector_db, normalize_query
+
+# Ollama 서버 설정
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_KEEP_ALIVE = "30m"  # 요청 사이에 모델을 메모리에 유지
+
+# 분석 모델 (DR_MODEL 환경변수로 변경 가능, 기본은 Q4_K_M 양자화 태그)
+DEFAULT_MODEL = os.getenv("DR_MODEL", "gemma3:4b-it-q4_K_M")
+FALLBACK_MODEL = "gemma3:4b"
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisError(Exception):
+    """Ollama 응답 생성 실패 (API에서 오류 상태로 반환, 답변 캐시에 저장하지 않음)"""
+
+
+class DomainAnalyzer:
+    """
+    도메인별 의료 분석기 기본 클래스
+    
+    하위 클래스는 DOMAIN, SYSTEM_PROMPT, CATEGORY_RULES 등 클래스 속성만 정의합니다.
+    """
+    
+    # 도메인 설정 (하위 클래스에서 정의)
+    DOMAIN = ""  # 벡터 DB source_type 및 가이드라인 이름에 사용
+    SYSTEM_PROMPT = ""
+    # 질문 유형별 응답 머리말 (먼저 일치하는 규칙 적용)
+    CATEGORY_RULES: List[Tuple[Pattern, str]] = []
+    # get_model_info()에 추가로 포함할 항목
+    MODEL_INFO_EXTRA: Dict[str, Any] = {}
+    
+    # 모든 응답 끝에 붙는 의학적 주의사항
+    DISCLAIMER = "\n\n⚠️ **의학적 주의사항**: 이 정보는 교육 목적으로만 제공됩니다. 실제 진단과 치료는 반드시 전문 의료진과 상담하시기 바랍니다."
+    
+    _DEFAULT_PREFIX = "🏥 **의료 정보**\n\n"
+    
+    # Ollama 생성 옵션 (Ollama는 max_tokens가 아닌 num_predict로 출력 길이 제한)
+    CHAT_OPTIONS = {
+        'temperature': 0.7,
+        'top_p': 0.9,
+        'num_predict': 768,
+        'num_ctx': 4096,
+        # 모델이 자체 주의사항을 쓰기 시작하면 중단 (DISCLAIMER는 직접 추가)
+        'stop': ["\n\n⚠️"]
+    }
+    
+    def __init__(self, model_name: str = DEFAULT_MODEL):
+        """
+        초기화
+        Args:
+            model_name: Ollama 모델 이름 (기본: DR_MODEL 환경변수 또는 gemma3:4b-it-q4_K_M)
+        """
+        self.model_name = model_name
+        self.system_prompt = self.SYSTEM_PROMPT
+        # 요청마다 공유하는 읽기 전용 system 메시지 (ollama>=0.4는 Mapping 메시지를 복사해 전송)
+        self._system_msg = MappingProxyType({'role': 'system', 'content': self.system_prompt})
+        # RAG 컨텍스트 뒤에 붙는 지시문
+        self._context_instruction = (
+            f"Based on the EAU {self.DOMAIN} cancer guidelines provided above, "
+            "provide a comprehensive medical response."
+        )
+        
+        # 연결 풀을 재사용하는 Ollama 클라이언트
+        self.client = ollama.Client(host=OLLAMA_HOST)
+        self.async_client = ollama.AsyncClient(host=OLLAMA_HOST)
+        
+        # 최종 답변 캐시: (정규화된 질문, 모델) -> 포맷 전 답변
+        self._answer_cache = TTLCache(maxsize=1024, ttl=3600)
+        self._answer_cache_lock = threading.Lock()
+        
+        # Ollama 모델 목록 캐시 (헬스체크가 몰려도 5초에 한 번만 조회)
+        self._models_cache = TTLCache(maxsize=1, ttl=5)
+        self._models_cache_lock = threading.Lock()
+        
+        # Ollama 연결 및 모델 존재 확인 (없으면 기본 태그로 대체)
+        self.validate_ollama_connection()
+        
+        # 벡터 DB 초기화 (프로세스 전역 인스턴스 공유)
+        try:
+            self.vector_db = get_vector_db()
+            logger.info("Vector DB initialized for %s guidelines", self.DOMAIN)
+        except Exception as e:
+            logger.warning("Vector DB initialization failed: %s", e)
+            self.vector_db = None
+    
+    def analyze_question(self, question: str) -> str:
+        """
+        도메인 관련 질문 분석 및 응답 생성
+        
+        Args:
+            question: 사용자의 의료 질문
+        
+        Returns:
+            전문적인 의료 응답
+        
+        Raises:
+            Exception: Ollama 서버 연결 실패 또는 모델 오류
+        """
+        try:
+            # 입력 검증
+            if not question or not question.strip():
+                return "질문을 입력해주세요."
+            
+            logger.info("분석 시작: %s...", question[:50])
+            
+            cached = self._get_cached_answer(question)
+            if cached is not None:
+                logger.info("캐시된 답변 반환")
+                return self._format_response(cached, question)
+            
+            # RAG: 관련 가이드라인 검색
+            context = self._retrieve_context(question)
+            
+            # Ollama 모델 호출
+            response = self.client.chat(
+                model=self.model_name,
+                messages=self._build_messages(question, context),
+                keep_alive=OLLAMA_KEEP_ALIVE,
+                options=self.CHAT_OPTIONS
+            )
+            
+            # 응답 추출
+            if response and 'message' in response:
+                answer = response['message']['content']
+                logger.info("분석 완료")
+                self._cache_answer(question, answer)
+                return self._format_response(answer, question)
+            else:
+                logger.error("모델 응답 형식 오류")
+                return "응답 생성 중 오류가 발생했습니다."
+        
+        except ollama.ResponseError as e:
+            logger.error("Ollama 응답 오류: %s", e)
+            return f"모델 응답 오류: {str(e)}"
+        except Exception as e:
+            logger.error("예상치 못한 오류: %s", e)
+            return f"시스템 오류가 발생했습니다: {str(e)}"
+    
+    async def stream_question(self, question: str) -> AsyncIterator[str]:
+        """
+        도메인 관련 질문에 대한 응답을 스트리밍으로 생성
+        
+        머리말은 모델 호출 전에, 주의사항은 스트림 종료 후에 전송하므로
+        클라이언트는 첫 토큰을 전체 응답 생성 완료 전에 받을 수 있습니다.
+        
+        Args:
+            question: 사용자의 의료 질문
+        
+        Yields:
+            응답 텍스트 조각 (머리말 → 모델 토큰 → 주의사항)
+        
+        Raises:
+            AnalysisError: Ollama 서버 연결 실패 또는 모델 오류 (머리말/일부 토큰 전송 후 발생 가능)
+        """
+        if not question or not question.strip():
+            yield "질문을 입력해주세요."
+            return
+        
+        logger.info("스트리밍 분석 시작: %s...", question[:50])
+        
+        cached = self._get_cached_answer(question)
+        if cached is None:
+            # RAG 검색(임베딩 + 벡터 검색)을 스레드에서 시작해 머리말 전송과 겹치게 실행
+            context_future = asyncio.get_running_loop().run_in_executor(
+                None, self._retrieve_context, question
+            )
+        
+        yield self._get_response_prefix(question)
+        
+        if cached is not None:
+            logger.info("캐시된 답변 반환")
+            yield cached
+            yield self.DISCLAIMER
+            return
+        
+        try:
+            # RAG: 관련 가이드라인 검색 결과 대기
+            context = await context_future
+            
+            # Ollama 모델 스트리밍 호출
+            stream = await self.async_client.chat(
+                model=self.model_name,
+                messages=self._build_messages(question, context),
+                stream=True,
+                keep_alive=OLLAMA_KEEP_ALIVE,
+                options=self.CHAT_OPTIONS
+            )
+            parts = []
+            async for chunk in stream:
+                content = chunk['message']['content']
+                if content:
+                    parts.append(content)
+                    yield content
+            
+            logger.info("스트리밍 분석 완료")
+            self._cache_answer(question, "".join(parts))
+            yield self.DISCLAIMER
+        
+        except ollama.ResponseError as e:
+            logger.error("Ollama 응답 오류: %s", e)
+            raise AnalysisError(f"모델 응답 오류: {str(e)}") from e
+        except Exception as e:
+            logger.error("예상치 못한 오류: %s", e)
+            raise AnalysisError(f"시스템 오류가 발생했습니다: {str(e)}") from e
+    
+    async def aanalyze_question(self, question: str) -> str:
+        """
+        도메인 관련 질문 분석 (비동기, 스트림을 모아 전체 응답 반환)
+        
+        Args:
+            question: 사용자의 의료 질문
+        
+        Returns:
+            전문적인 의료 응답
+        
+        Raises:
+            AnalysisError: Ollama 서버 연결 실패 또는 모델 오류
+        """
+        return "".join([part async for part in self.stream_question(question)])
+    
+    async def warm_up_model(self) -> None:
+        """
+        1토큰 생성 요청으로 모델을 메모리에 미리 로드 (첫 요청 로딩 지연 방지)
+        """
+        try:
+            await self.async_client.chat(
+                model=self.model_name,
+                messages=[{'role': 'user', 'content': 'warmup'}],
+                keep_alive=OLLAMA_KEEP_ALIVE,
+                options={'num_predict': 1}
+            )
+            logger.info("모델 사전 로드 완료: %s", self.model_name)
+        except Exception as e:
+            logger.warning("모델 사전 로드 실패: %s", e)
+    
+    def _retrieve_context(self, question: str) -> str:
+        """
+        벡터 DB에서 관련 가이드라인 컨텍스트 검색
+        
+        Args:
+            question: 사용자의 의료 질문
+        
+        Returns:
+            프롬프트용 컨텍스트 (없으면 빈 문자열)
+        """
+        context = ""
+        if self.vector_db:
+            try:
+                context = self.vector_db.get_context_for_prompt(
+                    query=question,
+                    source_type=self.DOMAIN,
+                    n_results=3
+                )
+                if context:
+                    logger.info("Retrieved context from %s cancer guidelines", self.DOMAIN)
+                else:
+                    logger.info("No relevant context found in guidelines")
+            except Exception as e:
+                logger.warning("Context retrieval failed: %s", e)
+        return context
+    
+    def _answer_cache_key(self, question: str) -> tuple:
+        """답변 캐시 키 (정규화된 질문, 모델)"""
+        return (normalize_query(question), self.model_name)
+    
+    def _get_cached_answer(self, question: str) -> Optional[str]:
+        """캐시된 답변 조회 (없거나 만료되면 None)"""
+        with self._answer_cache_lock:
+            return self._answer_cache.get(self._answer_cache_key(question))
+    
+    def _cache_answer(self, question: str, answer: str):
+        """생성된 답변 캐시 저장"""
+        if not answer:
+            return
+        with self._answer_cache_lock:
+            self._answer_cache[self._answer_cache_key(question)] = answer
+    
+    def _build_messages(self, question: str, context: str = "") -> list:
+        """
+        Ollama chat 메시지 구성 (RAG 컨텍스트는 별도 system 메시지로 전달)
+        
+        Args:
+            question: 사용자의 의료 질문
+            context: 벡터 DB에서 검색한 가이드라인 컨텍스트
+        
+        Returns:
+            chat 메시지 리스트
+        """
+        messages = [self._system_msg]
+        if context:
+            messages.append({
+                'role': 'system',
+                'content': f"{context}\n\n{self._context_instruction}"
+            })
+        messages.append({
+            'role': 'user',
+            'content': question
+        })
+        return messages
+    
+    def _format_response(self, answer: str, question: str) -> str:
+        """
+        응답 포맷팅
+        
+        Args:
+            answer: 원본 응답
+            question: 원본 질문
+        
+        Returns:
+            포맷된 응답
+        """
+        # 응답에 필수 경고 문구 추가
+        return self._get_response_prefix(question) + answer + self.DISCLAIMER
+    
+    def _get_response_prefix(self, question: str) -> str:
+        """
+        질문 유형에 따른 응답 머리말 반환
+        
+        Args:
+            question: 원본 질문
+        
+        Returns:
+            응답 머리말
+        """
+        # 질문 유형 분석
+        for pattern, prefix in self.CATEGORY_RULES:
+            if pattern.search(question):
+                return prefix
+        return self._DEFAULT_PREFIX
+    
+    def _list_models(self):
+        """
+        Ollama 모델 목록 조회 (5초 TTL 캐시)
+        
+        Returns:
+            Ollama 모델 목록 응답
+        """
+        with self._models_cache_lock:
+            models = self._models_cache.get('models')
+        if models is None:
+            models = self.client.list()
+            with self._models_cache_lock:
+                self._models_cache['models'] = models
+        return models
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """
+        모델 정보 반환
+        
+        Returns:
+            모델 상태 및 정보
+        """
+        try:
+            # Ollama 모델 정보 조회
+            models = self._list_models()
+            model_info = {
+                'model_name': self.model_name,
+                'status': 'unknown',
+                'size': 'unknown',
+                **self.MODEL_INFO_EXTRA
+            }
+            
+            for model in models.get('models', []):
+                if self.model_name in model.get('name', ''):
+                    model_info['status'] = 'available'
+                    model_info['size'] = model.get('size', 'unknown')
+                    break
+            
+            return model_info
+        
+        except Exception as e:
+            logger.error("모델 정보 조회 실패: %s", e)
+            return {
+                'model_name': self.model_name,
+                'status': 'error',
+                'error': str(e)
+            }
+    
+    def validate_ollama_connection(self) -> bool:
+        """
+        Ollama 서버 연결 확인
+        
+        Returns:
+            연결 성공 여부
+        """
+        try:
+            models = self._list_models()
+            logger.info("Ollama 서버 연결 성공")
+            self._ensure_model_available(models)
+            return True
+        except Exception as e:
+            logger.error("Ollama 서버 연결 실패: %s", e)
+            return False
+    
+    def _ensure_model_available(self, models) -> None:
+        """
+        설정된 모델이 Ollama에 없으면 기본 태그로 대체
+        
+        Args:
+            models: Ollama 모델 목록 응답
+        """
+        names = [model.get('name') or model.get('model', '') for model in models.get('models', [])]
+        if any(self.model_name in name for name in names):
+            return
+        
+        if self.model_name != FALLBACK_MODEL and any(FALLBACK_MODEL in name for name in names):
+            logger.warning("모델 %s 없음 - %s(으)로 대체합니다 (설치: ollama pull %s)",
+                           self.model_name, FALLBACK_MODEL, self.model_name)
+            self.model_name = FALLBACK_MODEL
+        else:
+            logger.warning("모델 %s을(를) Ollama에서 찾을 수 없습니다", self.model_name)
+
+
+@lru_cache(maxsize=None)
+def get_domain_analyzer(analyzer_cls: Type[DomainAnalyzer],
+                        model_name: str = DEFAULT_MODEL) -> DomainAnalyzer:
+    """
+    프로세스 전역 분석기 인스턴스 반환 (분석기 클래스·모델별 1회 생성)
+    
+    Args:
+        analyzer_cls: DomainAnalyzer 하위 클래스
+        model_name: 사용할 Ollama 모델
+    
+    Returns:
+        공유 분석기 인스턴스
+    """
+    return analyzer_cls(model_name=model_name)
@@ -0,0 +1,87 @@
+"""
+Request Coalescing
+처리 중인 질문과 같은 질문이 들어오면 Ollama를 다시 호출하지 않고 진행 중인 결과를 함께 기다리는 병합기
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Set
+
+logger = logging.getLogger(__name__)
+
+
+class RequestBatcher:
+    """동일 질문 요청 병합기 (대기 시간 창 없이 처리 중인 요청만 공유)"""
+
+    def __init__(self, handler: Callable[[str], Awaitable[str]]):
+        """
+        초기화
+
+        Args:
+            handler: 질문 하나를 받아 응답을 반환하는 코루틴 함수
+        """
+        self.handler = handler
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopped = False
+
+    async def start(self):
+        """요청 접수 시작 (FastAPI lifespan 시작 시 호출)"""
+        self._stopped = False
+        logger.info("Request coalescing started")
+
+    async def stop(self):
+        """요청 접수 종료, 처리 중인 요청은 취소하고 기다리던 호출자에게 오류 전달"""
+        self._stopped = True
+        for future in self._inflight.values():
+            if not future.done():
+                future.set_exception(RuntimeError("Request batcher stopped"))
+        self._inflight.clear()
+
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def submit(self, question: str) -> str:
+        """
+        질문 처리 (같은 질문이 처리 중이면 그 결과를 함께 기다림)
+
+        Args:
+            question: 사용자 질문
+
+        Returns:
+            handler가 생성한 응답
+        """
+        future = self._inflight.get(question)
+        if future is None:
+            if self._stopped:
+                raise RuntimeError("Request batcher stopped")
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[question] = future
+            task = asyncio.create_task(self._run(question, future))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            logger.info("Joining in-flight request for the same question")
+
+        # 한 호출자의 연결이 끊겨 취소되어도 같은 질문을 기다리는 다른 호출자에게는 영향 없음
+        return await asyncio.shield(future)
+
+    async def _run(self, question: str, future: asyncio.Future):
+        """handler를 한 번 실행하고 결과를 공유 future에 전달"""
+        try:
+            result = await self.handler(question)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            if self._inflight.get(question) is future:
+                del self._inflight[question]
+            # 기다리던 호출자가 모두 취소된 경우 "exception was never retrieved" 경고 방지
+            if future.done() and not future.cancelled():
+                future.exception()
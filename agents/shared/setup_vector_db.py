@@ -3,19 +3,52 @@
 """
 
 import os
-import sys
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+from typing import Any, Dict, Iterator, List
 
-# 프로젝트 루트를 Python 경로에 추가
-project_root = Path(__file__).parent.parent.parent
-sys.path.insert(0, str(project_root))
-
-from agents.shared.vector_db import MedicalVectorDB
+from agents.shared.vector_db import MedicalVectorDB, load_pdf_chunks
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 워커별로 미리 분할해 둘 최대 배치 수 (메모리 상한)
+PREFETCH_BATCHES = 4
+
+
+def _load_one(guideline: Dict[str, str], batch_queue) -> None:
+    """
+    워커 프로세스에서 가이드라인 PDF 하나를 로드/분할해 배치 단위로 큐에 전달
+    
+    Args:
+        guideline: path / source_type / name 정보
+        batch_queue: 청크 배치를 전달할 큐 (끝은 None, 오류는 {"error": ...})
+    """
+    try:
+        for batch in load_pdf_chunks(
+            pdf_path=guideline["path"],
+            source_type=guideline["source_type"],
+            chunk_size=1000,
+            chunk_overlap=200
+        ):
+            batch_queue.put(batch)
+    except Exception as e:
+        batch_queue.put({"error": str(e)})
+    finally:
+        batch_queue.put(None)
+
+
+def _drain(batch_queue) -> Iterator[Dict[str, List[Any]]]:
+    """큐에서 청크 배치를 꺼내 순서대로 반환 (워커 오류는 예외로 전달)"""
+    while True:
+        batch = batch_queue.get()
+        if batch is None:
+            return
+        if "error" in batch:
+            raise RuntimeError(batch["error"])
+        yield batch
+
 
 def setup_medical_vector_db():
     """의료 가이드라인 벡터 DB 구축"""
@@ -40,29 +73,45 @@ def setup_medical_vector_db():
         }
     ]
     
-    # 각 가이드라인 처리
+    # 존재하는 PDF만 처리
+    available = []
     for guideline in guidelines:
-        pdf_path = guideline["path"]
-        
-        if not os.path.exists(pdf_path):
-            logger.warning(f"PDF not found: {pdf_path}")
+        if not os.path.exists(guideline["path"]):
+            logger.warning(f"PDF not found: {guideline['path']}")
             continue
-        
-        logger.info(f"Processing: {guideline['name']}")
-        
-        # PDF 처리 및 벡터 DB 저장
-        result = db.process_pdf(
-            pdf_path=pdf_path,
-            source_type=guideline["source_type"],
-            chunk_size=1000,
-            chunk_overlap=200
-        )
-        
-        if result["status"] == "success":
-            logger.info(f"✓ Successfully processed {guideline['name']}")
-            logger.info(f"  - Chunks created: {result['chunks_processed']}")
-        else:
-            logger.error(f"✗ Failed to process {guideline['name']}: {result.get('error')}")
+        available.append(guideline)
+    
+    # PDF 파싱/분할은 프로세스별로 병렬 실행하고 배치 단위로 넘겨받아
+    # 임베딩과 저장은 메인 프로세스에서 수행 (큐 크기만큼만 메모리에 보관)
+    if available:
+        with Manager() as manager, \
+                ProcessPoolExecutor(max_workers=min(len(available), os.cpu_count() or 1)) as ex:
+            queues = [manager.Queue(maxsize=PREFETCH_BATCHES) for _ in available]
+            for guideline, batch_queue in zip(available, queues):
+                ex.submit(_load_one, guideline, batch_queue)
+            
+            # 각 가이드라인 처리
+            for guideline, batch_queue in zip(available, queues):
+                logger.info(f"Processing: {guideline['name']}")
+                
+                # 벡터 DB 저장
+                result = db.add_chunks(
+                    pdf_path=guideline["path"],
+                    source_type=guideline["source_type"],
+                    batches=_drain(batch_queue)
+                )
+                
+                if result["status"] == "success":
+                    logger.info(f"✓ Successfully processed {guideline['name']}")
+                    logger.info(f"  - Chunks created: {result['chunks_processed']}")
+                else:
+                    logger.error(f"✗ Failed to process {guideline['name']}: {result.get('error')}")
+                    # 워커가 큐가 가득 차 멈추지 않도록 남은 배치를 비움
+                    for _ in _drain(batch_queue):
+                        pass
+    
+    # 멀티 프로세스 임베딩 풀 정리 (MEDICAL_RAG_MP=1인 경우)
+    db.close()
     
     # 최종 통계
     stats = db.get_stats()
@@ -5,29 +5,224 @@ Vector Database Management using ChromaDB
 
 import os
 import logging
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Dict, Any, Optional
 from pathlib import Path
 import hashlib
+import json
+from functools import lru_cache
+import sys
+import threading
+import unicodedata
 
+from cachetools import LRUCache
+from diskcache import Cache
 import chromadb
 from chromadb.config import Settings
-from chromadb.utils import embedding_functions
+from chromadb.errors import ChromaError
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
-from sentence_transformers import SentenceTransformer
+from langchain_core.documents import Document
 import numpy as np
+import xxhash
+
+if TYPE_CHECKING:
+    # torch/sentence_transformers는 임포트 비용이 커서 embedder 첫 접근 시 로드
+    from sentence_transformers import SentenceTransformer
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def normalize_query(text: str) -> str:
+    """
+    캐시 키용 질문 정규화 (NFKC + casefold, ASCII 질문은 intern)
+    
+    Args:
+        text: 원본 질문/쿼리
+        
+    Returns:
+        정규화된 문자열
+    """
+    normalized = unicodedata.normalize("NFKC", text.strip()).casefold()
+    return sys.intern(normalized) if normalized.isascii() else normalized
+
+
+PDF_PAGE_WINDOW = 32  # 한 번에 분할할 페이지 수
+CHUNK_BATCH_SIZE = 256  # 한 번에 임베딩/저장할 청크 수
+
+# 전체 임베딩 행렬을 메모리에 올려 전수 검색 (MEDICAL_RAG_INMEM=1, 소규모 코퍼스용)
+USE_INMEM_INDEX = os.getenv("MEDICAL_RAG_INMEM") == "1"
+# 문서 임베딩을 멀티 프로세스 풀로 분산 (MEDICAL_RAG_MP=1, 다중 코어 CPU 적재용)
+USE_MP_ENCODE = os.getenv("MEDICAL_RAG_MP") == "1"
+# int8 양자화 사이드카 인덱스로 검색 (MEDICAL_RAG_INT8=1, 기본은 Chroma HNSW)
+USE_INT8_INDEX = os.getenv("MEDICAL_RAG_INT8") == "1"
+INT8_SCALE = 127  # L2 정규화된 임베딩 성분([-1, 1])의 int8 스케일
+INT8_SCORE_BLOCK = 4096  # int8 점수 계산 블록 행 수 (행렬 전체의 float32 복사 방지)
+
+
+def quantize_embeddings(embeddings) -> np.ndarray:
+    """
+    L2 정규화된 임베딩을 int8로 양자화
+    
+    Args:
+        embeddings: 임베딩 벡터 (1차원 또는 2차원)
+        
+    Returns:
+        int8 배열
+    """
+    scaled = np.rint(np.asarray(embeddings, dtype=np.float32) * INT8_SCALE)
+    return np.clip(scaled, -INT8_SCALE, INT8_SCALE).astype(np.int8)
+
+
+def _score_int8(vectors: np.ndarray,
+                query_vec: np.ndarray,
+                rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    int8 행렬과 양자화된 쿼리의 내적을 블록 단위로 계산
+    
+    Args:
+        vectors: int8 임베딩 행렬
+        query_vec: float32로 변환한 int8 쿼리 벡터
+        rows: 점수를 계산할 행 인덱스 (None이면 전체)
+        
+    Returns:
+        float32 점수 배열 (rows 순서)
+    """
+    n = len(vectors) if rows is None else len(rows)
+    scores = np.empty(n, dtype=np.float32)
+    for start in range(0, n, INT8_SCORE_BLOCK):
+        end = min(start + INT8_SCORE_BLOCK, n)
+        block = vectors[start:end] if rows is None else vectors[rows[start:end]]
+        # |내적| <= 384 * 127^2 < 2^24 이므로 float32 BLAS로 계산해도 정수 결과가 정확함
+        scores[start:end] = block.astype(np.float32) @ query_vec
+    return scores
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """점수가 높은 순으로 상위 k개 인덱스 반환"""
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+
+@lru_cache(maxsize=None)
+def _get_text_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """(청크 크기, 오버랩)별 텍스트 분할기 (프로세스 내 재사용)"""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", ".", " ", ""]
+    )
+
+
+def _iter_pdf_chunks(pdf_path: str,
+                     text_splitter: RecursiveCharacterTextSplitter,
+                     page_window: int = PDF_PAGE_WINDOW) -> Iterator[Document]:
+    """
+    PDF 페이지를 지연 로드하며 페이지 묶음 단위로 분할 (빈 페이지 제외)
+    
+    Args:
+        pdf_path: PDF 파일 경로
+        text_splitter: 텍스트 분할기
+        page_window: 한 번에 분할할 페이지 수
+        
+    Yields:
+        분할된 청크
+    """
+    pages = []
+    for page in PyPDFLoader(pdf_path).lazy_load():
+        # 스캔/그림 전용 페이지처럼 텍스트가 없는 페이지는 건너뜀
+        if not page.page_content.strip():
+            continue
+        pages.append(page)
+        if len(pages) >= page_window:
+            yield from text_splitter.split_documents(pages)
+            pages = []
+    if pages:
+        yield from text_splitter.split_documents(pages)
+
+
+def load_pdf_chunks(pdf_path: str,
+                    source_type: str,
+                    chunk_size: int = 1000,
+                    chunk_overlap: int = 200,
+                    batch_size: int = CHUNK_BATCH_SIZE) -> Iterator[Dict[str, List[Any]]]:
+    """
+    PDF 로드 및 청크 분할 (배치 단위로 생성해 PDF 전체를 메모리에 올리지 않음)
+    
+    Args:
+        pdf_path: PDF 파일 경로
+        source_type: 소스 타입 (bladder, prostate 등)
+        chunk_size: 청크 크기
+        chunk_overlap: 청크 오버랩
+        batch_size: 배치당 최대 청크 수
+        
+    Yields:
+        texts / metadatas / ids / hashes 리스트를 담은 딕셔너리 (최대 batch_size개)
+    """
+    # PDF 파일 체크
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+    
+    logger.info("Processing PDF: %s", pdf_path)
+    
+    # 텍스트 분할
+    text_splitter = _get_text_splitter(chunk_size, chunk_overlap)
+    
+    # 각 청크에 메타데이터 추가
+    batch = {"texts": [], "metadatas": [], "ids": [], "hashes": []}
+    total = 0
+    
+    for i, chunk in enumerate(_iter_pdf_chunks(pdf_path, text_splitter)):
+        # 텍스트 추출
+        text = chunk.page_content
+        batch["texts"].append(text)
+        
+        # 메타데이터 생성
+        batch["metadatas"].append({
+            "source": pdf_path,
+            "source_type": source_type,
+            "page": chunk.metadata.get("page", 0),
+            "chunk_index": i,
+            "chunk_size": len(text)
+        })
+        
+        # 고유 ID 생성 (청크 인덱스 + 64비트 해시), 128비트 해시는 임베딩 캐시 키로 사용
+        batch["ids"].append(f"{source_type}_{i}_{xxhash.xxh3_64_intdigest(text.encode()):016x}")
+        batch["hashes"].append(xxhash.xxh3_128_hexdigest(text.encode()))
+        total += 1
+        
+        if len(batch["texts"]) >= batch_size:
+            yield batch
+            batch = {"texts": [], "metadatas": [], "ids": [], "hashes": []}
+    
+    if batch["texts"]:
+        yield batch
+    
+    logger.info("Created %s chunks from PDF", total)
+
+
 class MedicalVectorDB:
     """의료 가이드라인 벡터 데이터베이스 관리"""
     
+    # 소규모(≤10k 청크) 가이드라인 코퍼스용 HNSW 인덱스 설정
+    HNSW_METADATA = {
+        # 임베딩을 L2 정규화해 저장/조회하므로 내적이 코사인 유사도와 동일
+        "hnsw:space": "ip",
+        "hnsw:M": 32,
+        "hnsw:construction_ef": 200,
+        "hnsw:search_ef": 64
+    }
+    
+    # stats.json이 없을 때 문서 수를 다시 셀 가이드라인 소스 타입
+    SOURCE_TYPES = ("bladder", "prostate")
+    
     def __init__(self, 
                  db_path: str = "./chroma_db",
                  collection_name: str = "medical_guidelines",
-                 embedding_model: str = "all-MiniLM-L6-v2"):
+                 embedding_model: str = "all-MiniLM-L6-v2",
+                 collection_metadata: Optional[Dict[str, Any]] = None):
         """
         초기화
         
@@ -35,46 +230,130 @@ class MedicalVectorDB:
             db_path: ChromaDB 저장 경로
             collection_name: 컬렉션 이름
             embedding_model: 임베딩 모델 이름
+            collection_metadata: 컬렉션 생성 시 사용할 메타데이터 (기본: HNSW_METADATA)
         """
         self.db_path = Path(db_path)
         self.collection_name = collection_name
         self.embedding_model_name = embedding_model
+        self.collection_metadata = collection_metadata or dict(self.HNSW_METADATA)
+        
+        # 프롬프트 컨텍스트 캐시: (정규화된 쿼리, 소스 타입, 결과 수) -> 컨텍스트
+        self._context_cache = LRUCache(maxsize=2048)
+        self._context_cache_lock = threading.Lock()
         
         # 디렉토리 생성
         self.db_path.mkdir(parents=True, exist_ok=True)
         
-        # ChromaDB 클라이언트 초기화
-        self.client = chromadb.PersistentClient(
-            path=str(self.db_path),
-            settings=Settings(
-                anonymized_telemetry=False,
-                allow_reset=True
-            )
-        )
+        # 소스 타입별 문서 수 (적재/삭제 시 갱신, get_stats에서 전체 스캔 생략)
+        self._stats_path = self.db_path / "stats.json"
+        self._stats_lock = threading.Lock()
         
-        # 임베딩 모델 초기화
-        logger.info(f"Loading embedding model: {embedding_model}")
-        self.embedder = SentenceTransformer(embedding_model)
+        # 임베딩 디스크 캐시 (쿼리: 반복 질문 시, 문서: 같은 청크 재적재 시 임베딩 모델 호출 생략), 첫 사용 시 열림
+        self._embedding_cache: Optional[Cache] = None
+        # 쿼리 임베딩 메모리 캐시: 쿼리 -> 벡터 튜플 (디스크 캐시 앞단)
+        self._query_embedding_cache = LRUCache(maxsize=2048)
+        self._query_embedding_cache_lock = threading.Lock()
         
-        # 임베딩 함수 정의
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name=embedding_model
-        )
+        # 문서 임베딩 배치 크기 (embedder 로드 시 GPU면 256으로 늘려 행렬 연산 활용)
+        self.encode_batch_size = 64
+        
+        # 메모리 전수 검색 캐시: 임베딩 행렬 + ids/문서/메타데이터, 첫 검색 시 로드
+        self.use_inmem_index = USE_INMEM_INDEX
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._source_types: Optional[np.ndarray] = None
+        self._inmem_lock = threading.Lock()
+        
+        # int8 양자화 사이드카 인덱스: (ids, vectors, 소스 타입별 행 인덱스), 첫 검색 시 로드
+        self.use_int8_index = USE_INT8_INDEX
+        self._int8_path = self.db_path / "int8_index.npz"
+        self._int8_index = None
+        self._int8_lock = threading.Lock()
         
-        # 컬렉션 가져오거나 생성
+        # 멀티 프로세스 임베딩 풀 (첫 문서 임베딩 시 생성, close()에서 종료)
+        self.use_mp_encode = USE_MP_ENCODE
+        self._mp_pool = None
+        
+        # ChromaDB 클라이언트/컬렉션과 임베딩 모델은 첫 사용 시 생성
+        self._client = None
+        self._collection = None
+        self._embedder = None
+        self._init_lock = threading.RLock()
+    
+    @property
+    def client(self):
+        """ChromaDB 클라이언트 (첫 접근 시 생성)"""
+        if self._client is None:
+            with self._init_lock:
+                if self._client is None:
+                    self._client = chromadb.PersistentClient(
+                        path=str(self.db_path),
+                        settings=Settings(
+                            anonymized_telemetry=False,
+                            allow_reset=True
+                        )
+                    )
+        return self._client
+    
+    @property
+    def embedder(self) -> "SentenceTransformer":
+        """임베딩 모델 (첫 접근 시 torch/sentence_transformers 임포트 및 로드)"""
+        if self._embedder is None:
+            with self._init_lock:
+                if self._embedder is None:
+                    from sentence_transformers import SentenceTransformer
+                    
+                    logger.info("Loading embedding model: %s", self.embedding_model_name)
+                    embedder = SentenceTransformer(self.embedding_model_name)
+                    if embedder.device.type == "cuda":
+                        self.encode_batch_size = 256
+                    self._embedder = embedder
+        return self._embedder
+    
+    @property
+    def embedding_cache(self) -> Cache:
+        """임베딩 디스크 캐시 (첫 접근 시 열림)"""
+        if self._embedding_cache is None:
+            with self._init_lock:
+                if self._embedding_cache is None:
+                    self._embedding_cache = Cache(str(self.db_path / "emb_cache"))
+        return self._embedding_cache
+    
+    @property
+    def collection(self):
+        """가이드라인 컬렉션 (첫 접근 시 로드 또는 생성)"""
+        if self._collection is None:
+            with self._init_lock:
+                if self._collection is None:
+                    # 임베딩은 항상 self.embedder로 직접 계산해 전달
+                    # get_or_create_collection(metadata=...)은 기존 컬렉션의 메타데이터를 덮어쓰고
+                    # (HNSW 인덱스의 거리 공간은 그대로), hnsw:space는 생성 후 바꿀 수 없으므로
+                    # 기존 컬렉션은 그대로 열고 metadata는 새로 만들 때만 전달
+                    try:
+                        self._collection = self.client.get_collection(self.collection_name)
+                        logger.info("Loaded existing collection: %s", self.collection_name)
+                    except (ValueError, ChromaError):  # 0.4.x는 ValueError, 이후 버전은 ChromaError 계열
+                        self._collection = self.client.create_collection(
+                            name=self.collection_name,
+                            metadata=self.collection_metadata
+                        )
+                        logger.info("Created new collection: %s", self.collection_name)
+        return self._collection
+    
+    def warm_up(self):
+        """
+        임베딩 모델과 HNSW 인덱스를 미리 메모리에 로드 (첫 요청 지연 방지)
+        """
         try:
-            self.collection = self.client.get_collection(
-                name=collection_name,
-                embedding_function=self.embedding_function
-            )
-            logger.info(f"Loaded existing collection: {collection_name}")
-        except:
-            self.collection = self.client.create_collection(
-                name=collection_name,
-                embedding_function=self.embedding_function,
-                metadata={"hnsw:space": "cosine"}
-            )
-            logger.info(f"Created new collection: {collection_name}")
+            self.embedder
+            self.collection.get(limit=1)
+            if self.use_inmem_index:
+                self.ensure_cache_warm()
+            logger.info("Collection warmed up: %s", self.collection_name)
+        except Exception as e:
+            logger.warning("Collection warm-up failed: %s", e)
     
     def process_pdf(self, 
                    pdf_path: str, 
@@ -94,73 +373,152 @@ class MedicalVectorDB:
             처리 결과 정보
         """
         try:
-            # PDF 파일 체크
-            if not os.path.exists(pdf_path):
-                raise FileNotFoundError(f"PDF file not found: {pdf_path}")
-            
-            logger.info(f"Processing PDF: {pdf_path}")
+            batches = load_pdf_chunks(pdf_path, source_type, chunk_size, chunk_overlap)
+            return self.add_chunks(pdf_path, source_type, batches)
             
-            # PDF 로드
-            loader = PyPDFLoader(pdf_path)
-            documents = loader.load()
-            
-            # 텍스트 분할
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap,
-                length_function=len,
-                separators=["\n\n", "\n", ".", " ", ""]
-            )
-            
-            chunks = text_splitter.split_documents(documents)
-            logger.info(f"Created {len(chunks)} chunks from PDF")
-            
-            # 각 청크에 메타데이터 추가
-            texts = []
-            metadatas = []
-            ids = []
+        except Exception as e:
+            logger.error("Error processing PDF: %s", e)
+            return {
+                "status": "error",
+                "error": str(e)
+            }
+    
+    def add_chunks(self,
+                   pdf_path: str,
+                   source_type: str,
+                   batches: Iterable[Dict[str, List[Any]]]) -> Dict[str, Any]:
+        """
+        load_pdf_chunks() 배치를 하나씩 임베딩하여 벡터 DB에 저장
+        
+        Args:
+            pdf_path: 원본 PDF 파일 경로
+            source_type: 소스 타입 (bladder, prostate 등)
+            batches: texts / metadatas / ids (/ hashes) 리스트를 담은 딕셔너리들
             
-            for i, chunk in enumerate(chunks):
-                # 텍스트 추출
-                text = chunk.page_content
-                texts.append(text)
+        Returns:
+            처리 결과 정보
+        """
+        chunks_processed = 0
+        try:
+            for batch in batches:
+                texts = batch["texts"]
                 
-                # 메타데이터 생성
-                metadata = {
-                    "source": pdf_path,
-                    "source_type": source_type,
-                    "page": chunk.metadata.get("page", 0),
-                    "chunk_index": i,
-                    "chunk_size": len(text)
-                }
-                metadatas.append(metadata)
+                # 청크 임베딩 (캐시에 없는 청크만 모델 호출)
+                embeddings = self._embed_documents(texts, batch.get("hashes"))
                 
-                # 고유 ID 생성
-                chunk_id = f"{source_type}_{i}_{hashlib.md5(text.encode()).hexdigest()[:8]}"
-                ids.append(chunk_id)
-            
-            # ChromaDB에 추가
-            self.collection.add(
-                documents=texts,
-                metadatas=metadatas,
-                ids=ids
-            )
+                # ChromaDB에 배치 추가 (Chroma 내부 임베딩 생략), 다음 배치 전에 해제
+                self.collection.add(
+                    documents=texts,
+                    embeddings=embeddings,
+                    metadatas=batch["metadatas"],
+                    ids=batch["ids"]
+                )
+                chunks_processed += len(texts)
             
-            logger.info(f"Successfully added {len(chunks)} chunks to vector DB")
+            logger.info("Successfully added %s chunks to vector DB", chunks_processed)
             
             return {
                 "status": "success",
                 "pdf_path": pdf_path,
-                "chunks_processed": len(chunks),
+                "chunks_processed": chunks_processed,
                 "source_type": source_type
             }
             
         except Exception as e:
-            logger.error(f"Error processing PDF: {e}")
+            logger.error("Error adding chunks: %s", e)
             return {
                 "status": "error",
                 "error": str(e)
             }
+        finally:
+            # 일부 배치만 저장되었어도 캐시/통계는 컬렉션 상태에 맞춤
+            if chunks_processed:
+                self._clear_context_cache()
+                self._invalidate_int8_index()
+                self._invalidate_inmem_index()
+                self._refresh_source_count(source_type)
+    
+    def _embed_documents(self,
+                         texts: List[str],
+                         hashes: Optional[List[str]] = None) -> List[List[float]]:
+        """
+        문서 청크 일괄 임베딩 (내용 해시 기반 디스크 캐시 우선 조회)
+        
+        Args:
+            texts: 임베딩할 텍스트 리스트
+            hashes: 각 텍스트의 xxh3_128 해시 (없으면 계산)
+            
+        Returns:
+            임베딩 벡터 리스트
+        """
+        if hashes is None:
+            hashes = [xxhash.xxh3_128_hexdigest(text.encode()) for text in texts]
+        
+        # 같은 내용의 청크(반복되는 머리글/바닥글/표 행 등)는 한 번만 조회/임베딩
+        groups: Dict[str, List[int]] = {}
+        for i, content_hash in enumerate(hashes):
+            groups.setdefault(content_hash, []).append(i)
+        
+        vectors_by_hash: Dict[str, List[float]] = {}
+        missing = []
+        for content_hash in groups:
+            cached = self.embedding_cache.get(("doc", self.embedding_model_name, content_hash))
+            if cached is not None:
+                vectors_by_hash[content_hash] = np.frombuffer(cached, dtype=np.float32).tolist()
+            else:
+                missing.append(content_hash)
+        
+        logger.info("Embedding cache: %s unique chunks (%s duplicates), %s hits, %s misses",
+                    len(groups), len(texts) - len(groups), len(groups) - len(missing), len(missing))
+        
+        # 캐시에 없는 고유 청크만 배치 단위로 한 번에 임베딩
+        if missing:
+            vectors = self._encode_texts([texts[groups[content_hash][0]] for content_hash in missing])
+            for content_hash, vec in zip(missing, vectors):
+                self.embedding_cache.set(("doc", self.embedding_model_name, content_hash), vec.tobytes())
+                vectors_by_hash[content_hash] = vec.tolist()
+        
+        # 원래 청크 순서로 복원 (ID/메타데이터는 청크별로 유지)
+        embeddings = [vectors_by_hash[content_hash] for content_hash in hashes]
+        return embeddings
+    
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        L2 정규화된 문서 임베딩 계산 (MEDICAL_RAG_MP=1이면 멀티 프로세스 풀 사용)
+        
+        Args:
+            texts: 임베딩할 텍스트 리스트
+            
+        Returns:
+            float32 임베딩 행렬
+        """
+        if self.use_mp_encode:
+            with self._init_lock:
+                if self._mp_pool is None:
+                    self._mp_pool = self.embedder.start_multi_process_pool()
+            vectors = np.asarray(self.embedder.encode_multi_process(
+                texts,
+                self._mp_pool,
+                batch_size=self.encode_batch_size,
+                chunk_size=64
+            ), dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            return vectors / np.maximum(norms, 1e-12)
+        
+        return self.embedder.encode(
+            texts,
+            batch_size=self.encode_batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=True
+        ).astype(np.float32)
+    
+    def close(self):
+        """멀티 프로세스 임베딩 풀 종료"""
+        with self._init_lock:
+            if self._mp_pool is not None:
+                self._embedder.stop_multi_process_pool(self._mp_pool)
+                self._mp_pool = None
     
     def search(self, 
               query: str, 
@@ -178,6 +536,18 @@ class MedicalVectorDB:
             검색 결과 리스트
         """
         try:
+            query_embedding = self.embed_query(query)
+            
+            if self.use_inmem_index:
+                formatted_results = self._search_inmem(query_embedding, source_type, n_results)
+                logger.info("Found %s results for query (in-memory index)", len(formatted_results))
+                return formatted_results
+            
+            if self.use_int8_index:
+                formatted_results = self._search_int8(query_embedding, source_type, n_results)
+                logger.info("Found %s results for query (int8 index)", len(formatted_results))
+                return formatted_results
+            
             # 필터 생성
             where_filter = {}
             if source_type:
@@ -185,7 +555,7 @@ class MedicalVectorDB:
             
             # 검색 수행
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=[query_embedding],
                 n_results=n_results,
                 where=where_filter if where_filter else None
             )
@@ -201,13 +571,208 @@ class MedicalVectorDB:
                         "id": results['ids'][0][i] if results['ids'] else ""
                     })
             
-            logger.info(f"Found {len(formatted_results)} results for query")
+            logger.info("Found %s results for query", len(formatted_results))
             return formatted_results
             
         except Exception as e:
-            logger.error(f"Error during search: {e}")
+            logger.error("Error during search: %s", e)
             return []
     
+    def ensure_cache_warm(self):
+        """컬렉션 전체(임베딩/문서/메타데이터)를 메모리 전수 검색용으로 로드"""
+        if self._matrix is not None:
+            return
+        with self._inmem_lock:
+            if self._matrix is not None:
+                return
+            all_data = self.collection.get(include=["embeddings", "documents", "metadatas"])
+            self._ids = list(all_data['ids'])
+            self._documents = list(all_data['documents'] or [])
+            self._metadatas = [metadata or {} for metadata in all_data['metadatas'] or []]
+            self._source_types = np.array(
+                [metadata.get('source_type', 'unknown') for metadata in self._metadatas],
+                dtype=str
+            )
+            if self._ids:
+                matrix = np.ascontiguousarray(all_data['embeddings'], dtype=np.float32)
+            else:
+                matrix = np.zeros((0, 0), dtype=np.float32)
+            self._matrix = matrix
+            logger.info("Loaded %s vectors into in-memory index", len(self._ids))
+    
+    def _search_inmem(self,
+                      query_embedding: List[float],
+                      source_type: Optional[str],
+                      n_results: int) -> List[Dict[str, Any]]:
+        """
+        메모리 임베딩 행렬 전수 검색 (행렬-벡터 곱 한 번 + argpartition)
+        
+        Args:
+            query_embedding: L2 정규화된 쿼리 임베딩
+            source_type: 특정 소스 타입으로 필터링 (옵션)
+            n_results: 반환할 결과 수
+            
+        Returns:
+            search()와 같은 형식의 검색 결과 리스트
+        """
+        self.ensure_cache_warm()
+        with self._inmem_lock:
+            matrix, ids = self._matrix, self._ids
+            documents, metadatas = self._documents, self._metadatas
+            source_types = self._source_types
+        if matrix is None or len(ids) == 0:
+            return []
+        
+        scores = matrix @ np.asarray(query_embedding, dtype=np.float32)
+        if source_type:
+            candidates = np.flatnonzero(source_types == source_type)
+            if len(candidates) == 0:
+                return []
+            top = candidates[_top_k(scores[candidates], n_results)]
+        else:
+            top = _top_k(scores, n_results)
+        
+        return [
+            {
+                "text": documents[i],
+                "metadata": metadatas[i],
+                # Chroma ip 공간과 같은 거리 정의 (1 - 내적)
+                "distance": float(1 - scores[i]),
+                "id": ids[i]
+            }
+            for i in top
+        ]
+    
+    def _invalidate_inmem_index(self):
+        """컬렉션 변경 시 메모리 인덱스 폐기 (다음 검색에서 재로드)"""
+        with self._inmem_lock:
+            self._matrix = None
+            self._ids = []
+            self._documents = []
+            self._metadatas = []
+            self._source_types = None
+    
+    def _search_int8(self,
+                     query_embedding: List[float],
+                     source_type: Optional[str],
+                     n_results: int) -> List[Dict[str, Any]]:
+        """
+        int8 사이드카 인덱스 전수 검색 (내적 기준, 본문/메타데이터는 Chroma에서 조회)
+        
+        Args:
+            query_embedding: L2 정규화된 쿼리 임베딩
+            source_type: 특정 소스 타입으로 필터링 (옵션)
+            n_results: 반환할 결과 수
+            
+        Returns:
+            search()와 같은 형식의 검색 결과 리스트
+        """
+        ids, vectors, rows_by_source = self._get_int8_index()
+        rows = rows_by_source.get(source_type) if source_type else None
+        if len(ids) == 0 or (source_type and rows is None):
+            return []
+        
+        # 소스 타입 필터는 미리 계산한 행 인덱스로 처리 (검색마다 마스크/부분 행렬 복사 생략)
+        query_vec = quantize_embeddings(query_embedding).astype(np.float32)
+        scores = _score_int8(vectors, query_vec, rows)
+        top = _top_k(scores, n_results)
+        top_ids = [str(doc_id) for doc_id in (ids[top] if rows is None else ids[rows[top]])]
+        
+        docs = self.collection.get(ids=top_ids, include=["documents", "metadatas"])
+        by_id = {
+            doc_id: (text, metadata)
+            for doc_id, text, metadata in zip(docs['ids'], docs['documents'], docs['metadatas'])
+        }
+        
+        formatted_results = []
+        for doc_id, score in zip(top_ids, scores[top]):
+            if doc_id not in by_id:
+                continue
+            text, metadata = by_id[doc_id]
+            formatted_results.append({
+                "text": text,
+                "metadata": metadata or {},
+                # Chroma ip 공간과 같은 거리 정의 (1 - 내적)
+                "distance": float(1 - score / (INT8_SCALE * INT8_SCALE)),
+                "id": doc_id
+            })
+        return formatted_results
+    
+    def _get_int8_index(self):
+        """
+        int8 인덱스 (ids, vectors, 소스 타입별 행 인덱스) 반환 (파일이 없으면 컬렉션에서 구축)
+        """
+        if self._int8_index is None:
+            with self._int8_lock:
+                if self._int8_index is None:
+                    try:
+                        with np.load(self._int8_path) as data:
+                            ids, source_types, vectors = data["ids"], data["source_types"], data["vectors"]
+                    except (OSError, KeyError, ValueError):
+                        ids, source_types, vectors = self._build_int8_index()
+                    rows_by_source = {
+                        str(src_type): np.flatnonzero(source_types == src_type)
+                        for src_type in np.unique(source_types)
+                    }
+                    self._int8_index = (ids, vectors, rows_by_source)
+        return self._int8_index
+    
+    def _build_int8_index(self):
+        """컬렉션의 임베딩을 int8로 양자화해 사이드카 파일로 저장"""
+        all_data = self.collection.get(include=["embeddings", "metadatas"])
+        ids = np.array(all_data['ids'], dtype=str)
+        source_types = np.array(
+            [(metadata or {}).get('source_type', 'unknown') for metadata in all_data['metadatas'] or []],
+            dtype=str
+        )
+        if len(ids):
+            vectors = quantize_embeddings(all_data['embeddings'])
+        else:
+            vectors = np.zeros((0, 0), dtype=np.int8)
+        
+        tmp_path = self._int8_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, ids=ids, source_types=source_types, vectors=vectors)
+        os.replace(tmp_path, self._int8_path)
+        logger.info("Built int8 index with %s vectors", len(ids))
+        return ids, source_types, vectors
+    
+    def _invalidate_int8_index(self):
+        """컬렉션 변경 시 int8 인덱스 폐기 (다음 검색에서 재구축)"""
+        with self._int8_lock:
+            self._int8_index = None
+            try:
+                self._int8_path.unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning("Failed to remove int8 index: %s", e)
+    
+    def embed_query(self, text: str) -> List[float]:
+        """
+        L2 정규화된 쿼리 임베딩 생성 (메모리 → 디스크 캐시 순으로 조회)
+        
+        Args:
+            text: 임베딩할 쿼리 텍스트
+            
+        Returns:
+            임베딩 벡터
+        """
+        with self._query_embedding_cache_lock:
+            cached_vec = self._query_embedding_cache.get(text)
+        if cached_vec is not None:
+            return list(cached_vec)
+        
+        key = hashlib.sha1(f"{self.embedding_model_name}:norm:{text}".encode()).hexdigest()
+        cached = self.embedding_cache.get(key)
+        if cached is not None:
+            vec = np.frombuffer(cached, dtype=np.float32)
+        else:
+            vec = np.asarray(self.embedder.encode(text, normalize_embeddings=True), dtype=np.float32)
+            self.embedding_cache.set(key, vec.tobytes(), expire=86400)
+        
+        with self._query_embedding_cache_lock:
+            self._query_embedding_cache[text] = tuple(vec.tolist())
+        return vec.tolist()
+    
     def get_context_for_prompt(self, 
                                query: str, 
                                source_type: Optional[str] = None,
@@ -223,25 +788,42 @@ class MedicalVectorDB:
         Returns:
             컨텍스트 텍스트
         """
+        query = normalize_query(query)
+        key = (query, source_type, n_results)
+        with self._context_cache_lock:
+            context = self._context_cache.get(key)
+        if context is not None:
+            return context
+        
+        context = self._build_context(query, source_type, n_results)
+        # 검색 실패로 빈 결과가 나온 경우는 캐시하지 않음
+        if context:
+            with self._context_cache_lock:
+                self._context_cache[key] = context
+        return context
+    
+    def _build_context(self,
+                       query: str,
+                       source_type: Optional[str],
+                       n_results: int) -> str:
+        """검색 결과로 프롬프트 컨텍스트 구성"""
         results = self.search(query, source_type, n_results)
         
         if not results:
             return ""
         
         # 컨텍스트 구성
-        context_parts = []
-        for i, result in enumerate(results, 1):
-            source = result['metadata'].get('source', 'Unknown')
-            page = result['metadata'].get('page', 'N/A')
-            text = result['text']
-            
-            context_parts.append(
-                f"[Reference {i} - Page {page}]:\n{text}\n"
-            )
-        
-        context = "\n---\n".join(context_parts)
+        context = "\n---\n".join(
+            f"[Reference {i} - Page {result['metadata'].get('page', 'N/A')}]:\n{result['text']}\n"
+            for i, result in enumerate(results, 1)
+        )
         return f"Based on the following medical guidelines:\n\n{context}"
     
+    def _clear_context_cache(self):
+        """컬렉션 변경 시 컨텍스트 캐시 무효화"""
+        with self._context_cache_lock:
+            self._context_cache.clear()
+    
     def get_stats(self) -> Dict[str, Any]:
         """
         데이터베이스 통계 반환
@@ -251,15 +833,9 @@ class MedicalVectorDB:
         """
         try:
             count = self.collection.count()
-            
-            # 소스 타입별 카운트 (간단한 방법)
-            all_data = self.collection.get()
-            source_types = {}
-            
-            if all_data['metadatas']:
-                for metadata in all_data['metadatas']:
-                    src_type = metadata.get('source_type', 'unknown')
-                    source_types[src_type] = source_types.get(src_type, 0) + 1
+            source_types = self._read_source_counts()
+            if source_types is None:
+                source_types = self._rebuild_source_counts()
             
             return {
                 "total_documents": count,
@@ -269,9 +845,82 @@ class MedicalVectorDB:
                 "db_path": str(self.db_path)
             }
         except Exception as e:
-            logger.error(f"Error getting stats: {e}")
+            logger.error("Error getting stats: %s", e)
             return {"error": str(e)}
     
+    def _read_source_counts(self) -> Optional[Dict[str, int]]:
+        """stats.json의 소스 타입별 문서 수 (파일이 없거나 손상되면 None)"""
+        try:
+            with open(self._stats_path, encoding="utf-8") as f:
+                return json.load(f)["source_types"]
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def _write_source_counts(self, source_types: Dict[str, int]):
+        """stats.json 원자적 저장"""
+        tmp_path = self._stats_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"source_types": source_types}, f)
+        os.replace(tmp_path, self._stats_path)
+    
+    def _update_source_counts(self, source_type: str, count: Optional[int]):
+        """
+        소스 타입별 문서 수 갱신
+        
+        Args:
+            source_type: 소스 타입
+            count: 해당 타입의 현재 문서 수 (None이면 해당 타입 제거)
+        """
+        try:
+            with self._stats_lock:
+                source_types = self._read_source_counts()
+                if source_types is None:
+                    # 기준값이 없으면 다음 get_stats()에서 컬렉션 기준으로 재구성
+                    return
+                if count is None:
+                    source_types.pop(source_type, None)
+                else:
+                    source_types[source_type] = count
+                self._write_source_counts(source_types)
+        except OSError as e:
+            logger.warning("Failed to update stats file: %s", e)
+    
+    def _refresh_source_count(self, source_type: str):
+        """
+        적재 후 소스 타입 문서 수 갱신 (이미 있는 ID는 add에서 건너뛰므로 추가 건수 대신 실제 문서 수 사용)
+        
+        실패해도 예외를 올리지 않아 적재 중 발생한 원래 오류를 가리지 않음
+        (stats.json을 지워 다음 get_stats()에서 재구성)
+        """
+        try:
+            self._update_source_counts(source_type, self._count_source_type(source_type))
+        except Exception as e:
+            logger.warning("Failed to refresh document count for %s: %s", source_type, e)
+            try:
+                with self._stats_lock:
+                    self._stats_path.unlink(missing_ok=True)
+            except OSError:
+                pass
+    
+    def _count_source_type(self, source_type: str) -> int:
+        """컬렉션에 저장된 특정 소스 타입 문서 수 (ID만 조회)"""
+        return len(self.collection.get(where={"source_type": source_type}, include=[])["ids"])
+    
+    def _rebuild_source_counts(self) -> Dict[str, int]:
+        """알려진 소스 타입별로 ID만 조회해 문서 수 재계산 후 stats.json 저장 (전체 메타데이터 스캔 없음)"""
+        source_types = {}
+        for src_type in self.SOURCE_TYPES:
+            count = self._count_source_type(src_type)
+            if count:
+                source_types[src_type] = count
+        
+        try:
+            with self._stats_lock:
+                self._write_source_counts(source_types)
+        except OSError as e:
+            logger.warning("Failed to write stats file: %s", e)
+        return source_types
+    
     def clear_collection(self, source_type: Optional[str] = None):
         """
         컬렉션 클리어
@@ -283,22 +932,28 @@ class MedicalVectorDB:
             if source_type:
                 # 특정 소스 타입만 삭제
                 results = self.collection.get(
-                    where={"source_type": source_type}
+                    where={"source_type": source_type},
+                    include=[]
                 )
                 if results['ids']:
                     self.collection.delete(ids=results['ids'])
-                    logger.info(f"Cleared {len(results['ids'])} documents of type {source_type}")
+                    logger.info("Cleared %s documents of type %s", len(results['ids']), source_type)
+                self._update_source_counts(source_type, None)
             else:
                 # 전체 컬렉션 삭제 및 재생성
                 self.client.delete_collection(name=self.collection_name)
-                self.collection = self.client.create_collection(
+                self._collection = self.client.create_collection(
                     name=self.collection_name,
-                    embedding_function=self._embedding_function,
-                    metadata={"hnsw:space": "cosine"}
+                    metadata=self.collection_metadata
                 )
+                self._write_source_counts({})
                 logger.info("Cleared entire collection")
         except Exception as e:
-            logger.error(f"Error clearing collection: {e}")
+            logger.error("Error clearing collection: %s", e)
+        finally:
+            self._clear_context_cache()
+            self._invalidate_int8_index()
+            self._invalidate_inmem_index()
 
 
 # 싱글톤 인스턴스
@@ -313,6 +968,8 @@ def get_vector_db(db_path: str = "./chroma_db") -> MedicalVectorDB:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     # 테스트 코드
     db = MedicalVectorDB()
     
@@ -4,14 +4,18 @@ DR_BLADDER와 DR_PROSTATE를 통합하여 종합적인 의료 상담을 제공
 Port: 8003
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any, List
+from typing import AsyncIterator, Dict, Any, List, Union
+import json
 import logging
 import uvicorn
 import asyncio
 from datetime import datetime
+from cachetools import TTLCache
 
 # 오케스트레이터 로직 임포트
 from orchestrator_logic import MedicalOrchestrator
@@ -20,11 +24,19 @@ from orchestrator_logic import MedicalOrchestrator
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """앱 종료 시 에이전트 호출용 HTTP 세션 정리"""
+    yield
+    await orchestrator.close()
+
 # FastAPI 앱 초기화
 app = FastAPI(
     title="Medical Consultation Orchestrator API",
     description="AI Medical A2A Consultation System - 전문 AI 에이전트들을 통합한 의료 상담 API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS 설정
@@ -62,8 +74,8 @@ class StatusUpdate(BaseModel):
     status: str
     message: str
 
-# 진행 상황 추적을 위한 임시 저장소
-consultation_progress = {}
+# 진행 상황 추적을 위한 임시 저장소 (최근 상담만 1시간 보관)
+consultation_progress = TTLCache(maxsize=2048, ttl=3600)
 
 # 엔드포인트
 @app.get("/")
@@ -91,7 +103,7 @@ async def health_check() -> HealthResponse:
     """전체 시스템 헬스체크"""
     try:
         logger.info("🏥 전체 시스템 헬스체크 시작...")
-        health_data = orchestrator.check_all_agents_health()
+        health_data = await orchestrator.check_all_agents_health()
         
         # 전체 시스템 상태 결정
         overall_status = "healthy"
@@ -119,7 +131,7 @@ async def health_check() -> HealthResponse:
 async def get_agents_status() -> Dict[str, Any]:
     """개별 에이전트 상태 조회"""
     try:
-        return orchestrator.check_all_agents_health()
+        return await orchestrator.check_all_agents_health()
     except Exception as e:
         logger.error(f"❌ 에이전트 상태 조회 실패: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get agents status: {str(e)}")
@@ -144,13 +156,35 @@ async def get_consultation_progress(consultation_id: str) -> List[StatusUpdate]:
     
     return [StatusUpdate(**update) for update in consultation_progress[consultation_id]]
 
-@app.post("/consult")
-async def medical_consultation(request: ConsultationRequest, background_tasks: BackgroundTasks) -> Dict[str, Any]:
+async def _consultation_sse(consultation_id: str, question: str) -> AsyncIterator[str]:
+    """상담 이벤트를 Server-Sent Events 형식으로 변환"""
+    yield f"event: start\ndata: {json.dumps({'consultation_id': consultation_id})}\n\n"
+    completed_agents = 0
+    async for event in orchestrator.stream_consultation(question):
+        if event["type"] == "token":
+            # SSE 규격: 여러 줄 데이터는 각 줄마다 "data: " 접두사 필요
+            yield "data: " + event["content"].replace("\n", "\ndata: ") + "\n\n"
+        elif event["type"] == "agent":
+            agent = event["result"].get("agent", event["key"])
+            add_progress_update(consultation_id, agent, "completed", f"{agent} 상담 완료")
+            completed_agents += 1
+            # 두 전문가 응답이 모두 도착한 뒤 한 번만 종합 단계로 전환
+            if completed_agents == 2:
+                add_progress_update(consultation_id, "ORCHESTRATOR", "synthesizing", "전문가 의견을 종합하는 중...")
+            yield f"event: agent\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        else:
+            add_progress_update(consultation_id, "ORCHESTRATOR", "completed", "종합 의료 상담이 완료되었습니다")
+            yield f"event: end\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+@app.post("/consult", response_model=None)
+async def medical_consultation(request: ConsultationRequest, background_tasks: BackgroundTasks,
+                               stream: bool = False) -> Union[Dict[str, Any], StreamingResponse]:
     """
     종합 의료 상담 엔드포인트
     
     Args:
         request: 상담 요청 (질문 포함)
+        stream: True이면 에이전트 응답과 종합 의견 토큰을 text/event-stream으로 스트리밍
         
     Returns:
         종합 의료 상담 결과
@@ -170,6 +204,12 @@ async def medical_consultation(request: ConsultationRequest, background_tasks: B
         add_progress_update(consultation_id, "ORCHESTRATOR", "started", "의료 상담을 시작합니다")
         add_progress_update(consultation_id, "ORCHESTRATOR", "querying", "전문 에이전트들에게 질의를 보내는 중...")
         
+        if stream:
+            return StreamingResponse(
+                _consultation_sse(consultation_id, request.question),
+                media_type="text/event-stream"
+            )
+        
         # 전체 상담 프로세스 실행
         result = await orchestrator.full_consultation(request.question)
         
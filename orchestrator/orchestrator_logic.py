@@ -3,10 +3,9 @@ Medical Consultation Orchestrator
 두 전문 AI 에이전트(DR_BLADDER, DR_PROSTATE)에게 질의하고 결과를 종합하는 오케스트레이터
 """
 
-import requests
 import asyncio
 import aiohttp
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any
 import logging
 import json
 from datetime import datetime
@@ -16,6 +15,47 @@ import ollama
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 종합 의견 생성을 위한 프롬프트 ({question}, {bladder_opinion}, {prostate_opinion})
+SYNTHESIS_PROMPT_TEMPLATE = """
+당신은 의료 상담 결과를 종합하는 전문 의료 AI입니다. 
+두 전문가의 의견을 바탕으로 환자에게 도움이 되는 종합적인 의료 정보를 제공해주세요.
+
+**환자 질문:**
+{question}
+
+**방광 전문가 (DR_BLADDER) 의견:**
+{bladder_opinion}
+
+**전립선 전문가 (DR_PROSTATE) 의견:**
+{prostate_opinion}
+
+**요청사항:**
+1. 두 전문가 의견을 종합하여 환자에게 도움이 되는 통합된 답변을 제공해주세요
+2. 각 전문가의 핵심 포인트를 정리해주세요
+3. 추가적으로 고려해야 할 사항이 있다면 언급해주세요
+4. 반드시 전문 의료진과의 상담 필요성을 강조해주세요
+
+**형식:**
+📋 **종합 의료 상담 결과**
+
+## 핵심 요약
+[두 전문가 의견의 핵심 내용]
+
+## 방광 전문가 주요 의견
+[DR_BLADDER의 핵심 포인트]
+
+## 전립선 전문가 주요 의견  
+[DR_PROSTATE의 핵심 포인트]
+
+## 통합 권장사항
+[종합적인 권장사항]
+
+## 추가 고려사항
+[추가로 고려해야 할 내용]
+
+⚠️ **중요한 의학적 면책조항**: 이 정보는 교육 목적으로만 제공됩니다. 실제 진단과 치료는 반드시 전문 의료진과 상담하시기 바랍니다.
+"""
+
 
 class MedicalOrchestrator:
     """의료 상담 오케스트레이터 클래스"""
@@ -25,6 +65,12 @@ class MedicalOrchestrator:
         self.prostate_api_url = "http://localhost:8002"
         self.model_name = "gemma3:4b"
         
+        # 종합 의견 생성용 비동기 Ollama 클라이언트 (이벤트 루프 블로킹 방지)
+        self.async_client = ollama.AsyncClient()
+        
+        # 에이전트 호출용 HTTP 세션 (첫 질의 시 생성, 커넥션 재사용)
+        self._session: Optional[aiohttp.ClientSession] = None
+        
         # Ollama 연결 테스트
         self.validate_ollama_connection()
     
@@ -38,36 +84,61 @@ class MedicalOrchestrator:
             logger.error(f"❌ Ollama 연결 실패: {e}")
             return False
     
-    def check_agent_health(self, agent_name: str, url: str) -> Dict[str, Any]:
+    async def check_agent_health(self, agent_name: str, url: str) -> Dict[str, Any]:
         """개별 에이전트 헬스체크"""
         try:
-            response = requests.get(f"{url}/health", timeout=5)
-            if response.status_code == 200:
-                health_data = response.json()
-                logger.info(f"✅ {agent_name} 상태: {health_data.get('status', 'unknown')}")
-                return {"status": "healthy", "data": health_data}
-            else:
-                logger.warning(f"⚠️ {agent_name} 응답 코드: {response.status_code}")
-                return {"status": "degraded", "message": f"HTTP {response.status_code}"}
+            async with self._get_session().get(
+                f"{url}/health",
+                timeout=aiohttp.ClientTimeout(total=5)
+            ) as response:
+                if response.status == 200:
+                    health_data = await response.json()
+                    logger.info(f"✅ {agent_name} 상태: {health_data.get('status', 'unknown')}")
+                    return {"status": "healthy", "data": health_data}
+                else:
+                    logger.warning(f"⚠️ {agent_name} 응답 코드: {response.status}")
+                    return {"status": "degraded", "message": f"HTTP {response.status}"}
         except Exception as e:
             logger.error(f"❌ {agent_name} 헬스체크 실패: {e}")
             return {"status": "unhealthy", "error": str(e)}
     
-    def check_all_agents_health(self) -> Dict[str, Any]:
-        """모든 에이전트 헬스체크"""
+    async def check_all_agents_health(self) -> Dict[str, Any]:
+        """모든 에이전트 헬스체크 (동시 실행)"""
+        bladder_health, prostate_health = await asyncio.gather(
+            self.check_agent_health("DR_BLADDER", self.bladder_api_url),
+            self.check_agent_health("DR_PROSTATE", self.prostate_api_url)
+        )
         return {
-            "bladder": self.check_agent_health("DR_BLADDER", self.bladder_api_url),
-            "prostate": self.check_agent_health("DR_PROSTATE", self.prostate_api_url),
+            "bladder": bladder_health,
+            "prostate": prostate_health,
             "orchestrator": {"status": "healthy", "model": self.model_name}
         }
     
-    async def query_agent_async(self, session: aiohttp.ClientSession, agent_name: str, 
-                               url: str, question: str) -> Dict[str, Any]:
+    def _get_session(self) -> aiohttp.ClientSession:
+        """공유 HTTP 세션 반환 (이벤트 루프 안에서 첫 호출 시 생성)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=32,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=60,
+                    enable_cleanup_closed=True
+                )
+            )
+        return self._session
+    
+    async def close(self):
+        """공유 HTTP 세션 종료"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def query_agent_async(self, agent_name: str, url: str, question: str) -> Dict[str, Any]:
         """비동기로 개별 에이전트에게 질의"""
         try:
             logger.info(f"🔄 {agent_name}에게 질의 중...")
             
-            async with session.post(
+            async with self._get_session().post(
                 f"{url}/ask",
                 json={"question": question},
                 headers={"Content-Type": "application/json"},
@@ -104,31 +175,54 @@ class MedicalOrchestrator:
         """모든 에이전트에게 동시에 질의"""
         logger.info(f"🚀 의료 상담 시작: {question[:100]}...")
         
-        async with aiohttp.ClientSession() as session:
-            # 두 에이전트에게 동시에 질의
-            tasks = [
-                self.query_agent_async(session, "DR_BLADDER", self.bladder_api_url, question),
-                self.query_agent_async(session, "DR_PROSTATE", self.prostate_api_url, question)
-            ]
-            
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # 결과 정리
-            bladder_result = results[0] if not isinstance(results[0], Exception) else {
-                "agent": "DR_BLADDER", "status": "error", "error": str(results[0])
-            }
-            prostate_result = results[1] if not isinstance(results[1], Exception) else {
-                "agent": "DR_PROSTATE", "status": "error", "error": str(results[1])
-            }
-            
-            return {
-                "question": question,
-                "bladder_consultation": bladder_result,
-                "prostate_consultation": prostate_result,
-                "query_timestamp": datetime.now().isoformat()
-            }
+        # 두 에이전트에게 동시에 질의
+        tasks = [
+            self.query_agent_async("DR_BLADDER", self.bladder_api_url, question),
+            self.query_agent_async("DR_PROSTATE", self.prostate_api_url, question)
+        ]
+        
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # 결과 정리
+        bladder_result = results[0] if not isinstance(results[0], Exception) else {
+            "agent": "DR_BLADDER", "status": "error", "error": str(results[0])
+        }
+        prostate_result = results[1] if not isinstance(results[1], Exception) else {
+            "agent": "DR_PROSTATE", "status": "error", "error": str(results[1])
+        }
+        
+        return {
+            "question": question,
+            "bladder_consultation": bladder_result,
+            "prostate_consultation": prostate_result,
+            "query_timestamp": datetime.now().isoformat()
+        }
+    
+    def _build_synthesis_prompt(self, question: str,
+                                bladder_result: Dict[str, Any],
+                                prostate_result: Dict[str, Any]) -> str:
+        """두 전문가 응답으로 종합 의견 생성용 프롬프트 구성"""
+        # 각 전문가 의견 추출
+        bladder_opinion = ""
+        prostate_opinion = ""
+        
+        if bladder_result["status"] == "success":
+            bladder_opinion = bladder_result["response"].get("answer", "응답 없음")
+        else:
+            bladder_opinion = f"오류: {bladder_result.get('error', '알 수 없는 오류')}"
+        
+        if prostate_result["status"] == "success":
+            prostate_opinion = prostate_result["response"].get("answer", "응답 없음")
+        else:
+            prostate_opinion = f"오류: {prostate_result.get('error', '알 수 없는 오류')}"
+        
+        return SYNTHESIS_PROMPT_TEMPLATE.format_map({
+            "question": question,
+            "bladder_opinion": bladder_opinion,
+            "prostate_opinion": prostate_opinion
+        })
     
-    def synthesize_consultation(self, consultation_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def synthesize_consultation(self, consultation_data: Dict[str, Any]) -> Dict[str, Any]:
         """두 전문가 의견을 종합하여 최종 의료 상담 결과 생성"""
         try:
             logger.info("🧠 의료 상담 결과 종합 중...")
@@ -137,64 +231,11 @@ class MedicalOrchestrator:
             bladder_result = consultation_data["bladder_consultation"]
             prostate_result = consultation_data["prostate_consultation"]
             
-            # 각 전문가 의견 추출
-            bladder_opinion = ""
-            prostate_opinion = ""
-            
-            if bladder_result["status"] == "success":
-                bladder_opinion = bladder_result["response"].get("answer", "응답 없음")
-            else:
-                bladder_opinion = f"오류: {bladder_result.get('error', '알 수 없는 오류')}"
-            
-            if prostate_result["status"] == "success":
-                prostate_opinion = prostate_result["response"].get("answer", "응답 없음")
-            else:
-                prostate_opinion = f"오류: {prostate_result.get('error', '알 수 없는 오류')}"
-            
-            # 종합 의견 생성을 위한 프롬프트
-            synthesis_prompt = f"""
-당신은 의료 상담 결과를 종합하는 전문 의료 AI입니다. 
-두 전문가의 의견을 바탕으로 환자에게 도움이 되는 종합적인 의료 정보를 제공해주세요.
-
-**환자 질문:**
-{question}
-
-**방광 전문가 (DR_BLADDER) 의견:**
-{bladder_opinion}
-
-**전립선 전문가 (DR_PROSTATE) 의견:**
-{prostate_opinion}
-
-**요청사항:**
-1. 두 전문가 의견을 종합하여 환자에게 도움이 되는 통합된 답변을 제공해주세요
-2. 각 전문가의 핵심 포인트를 정리해주세요
-3. 추가적으로 고려해야 할 사항이 있다면 언급해주세요
-4. 반드시 전문 의료진과의 상담 필요성을 강조해주세요
-
-**형식:**
-📋 **종합 의료 상담 결과**
-
-## 핵심 요약
-[두 전문가 의견의 핵심 내용]
-
-## 방광 전문가 주요 의견
-[DR_BLADDER의 핵심 포인트]
-
-## 전립선 전문가 주요 의견  
-[DR_PROSTATE의 핵심 포인트]
-
-## 통합 권장사항
-[종합적인 권장사항]
-
-## 추가 고려사항
-[추가로 고려해야 할 내용]
-
-⚠️ **중요한 의학적 면책조항**: 이 정보는 교육 목적으로만 제공됩니다. 실제 진단과 치료는 반드시 전문 의료진과 상담하시기 바랍니다.
-"""
+            synthesis_prompt = self._build_synthesis_prompt(question, bladder_result, prostate_result)
             
             # Ollama를 사용한 종합 의견 생성
             try:
-                response = ollama.chat(
+                response = await self.async_client.chat(
                     model=self.model_name,
                     messages=[
                         {
@@ -245,7 +286,7 @@ class MedicalOrchestrator:
             consultation_data = await self.query_all_agents(question)
             
             # 2. 결과 종합
-            final_result = self.synthesize_consultation(consultation_data)
+            final_result = await self.synthesize_consultation(consultation_data)
             
             return final_result
             
@@ -262,6 +303,68 @@ class MedicalOrchestrator:
                 }
             }
 
+    
+    async def stream_consultation(self, question: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        의료 상담 프로세스를 이벤트 단위로 스트리밍
+        
+        에이전트 응답은 도착하는 순서대로 바로 전달하고, 두 응답이 모이면
+        종합 의견을 토큰 단위로 생성합니다.
+        
+        Args:
+            question: 환자 질문
+        
+        Yields:
+            {"type": "agent", "key": ..., "result": ...} → {"type": "token", "content": ...} → {"type": "done", ...}
+        """
+        logger.info(f"🚀 스트리밍 의료 상담 시작: {question[:100]}...")
+        
+        async def query(key: str, agent_name: str, url: str):
+            return key, await self.query_agent_async(agent_name, url, question)
+        
+        results = {}
+        for next_result in asyncio.as_completed([
+            query("bladder_specialist", "DR_BLADDER", self.bladder_api_url),
+            query("prostate_specialist", "DR_PROSTATE", self.prostate_api_url)
+        ]):
+            key, result = await next_result
+            results[key] = result
+            yield {"type": "agent", "key": key, "result": result}
+        
+        synthesis_prompt = self._build_synthesis_prompt(
+            question, results["bladder_specialist"], results["prostate_specialist"]
+        )
+        
+        logger.info("🧠 의료 상담 결과 종합 중 (스트리밍)...")
+        synthesis_status = "success"
+        try:
+            stream = await self.async_client.chat(
+                model=self.model_name,
+                messages=[{'role': 'user', 'content': synthesis_prompt}],
+                stream=True
+            )
+            async for chunk in stream:
+                content = chunk['message']['content']
+                if content:
+                    yield {"type": "token", "content": content}
+            logger.info("✅ 의료 상담 결과 종합 완료")
+        except Exception as e:
+            logger.error(f"❌ 종합 의견 생성 실패: {e}")
+            synthesis_status = "partial"
+            yield {
+                "type": "token",
+                "content": f"종합 의견 생성에 실패했습니다. 각 전문가 의견을 개별적으로 참고해주세요.\n\n오류: {str(e)}"
+            }
+        
+        yield {
+            "type": "done",
+            "consultation_timestamp": datetime.now().isoformat(),
+            "orchestrator_info": {
+                "version": "1.0.0",
+                "model": self.model_name,
+                "synthesis_status": synthesis_status
+            }
+        }
 
 # 메인 함수 (테스트용)
 async def main():
@@ -269,7 +372,7 @@ async def main():
     orchestrator = MedicalOrchestrator()
     
     # 헬스체크
-    health = orchestrator.check_all_agents_health()
+    health = await orchestrator.check_all_agents_health()
     print("🏥 시스템 상태:")
     print(json.dumps(health, indent=2, ensure_ascii=False))
     
@@ -280,6 +383,7 @@ async def main():
     print("=" * 80)
     
     result = await orchestrator.full_consultation(test_question)
+    await orchestrator.close()
     print("\n📋 최종 상담 결과:")
     print(json.dumps(result, indent=2, ensure_ascii=False))
 
@@ -53,6 +53,13 @@ class Config:
         self.top_k = 3  # 검색할 문서 수
         # 벡터화 배치 크기 (Windows에서는 더 작은 값 사용)
         self.batch_size = 16 if os.name == 'nt' else 32
+        # 문서 임베딩 동시 요청 수 (Ollama 임베딩 API 병렬 호출)
+        self.embed_workers = 8
+        
+        # 시맨틱 캐시 설정 (질문 임베딩 코사인 유사도 기반)
+        self.semantic_cache_size = 256
+        self.semantic_cache_threshold = 0.95
+        self.semantic_cache_ttl = 600  # 초
         
         # 모델 생성 설정
         self.temperature = 0.7
@@ -108,6 +115,12 @@ class Config:
                 # RAG 설정
                 "top_k": self.top_k,
                 "batch_size": self.batch_size,
+                "embed_workers": self.embed_workers,
+                
+                # 시맨틱 캐시 설정
+                "semantic_cache_size": self.semantic_cache_size,
+                "semantic_cache_threshold": self.semantic_cache_threshold,
+                "semantic_cache_ttl": self.semantic_cache_ttl,
                 
                 # 모델 생성 설정
                 "temperature": self.temperature,
@@ -142,6 +155,10 @@ class Config:
             "pdf_path": self.pdf_path,
             "top_k": self.top_k,
             "batch_size": self.batch_size,
+            "embed_workers": self.embed_workers,
+            "semantic_cache_size": self.semantic_cache_size,
+            "semantic_cache_threshold": self.semantic_cache_threshold,
+            "semantic_cache_ttl": self.semantic_cache_ttl,
             "temperature": self.temperature,
             "top_k_generate": self.top_k_generate,
             "top_p": self.top_p,
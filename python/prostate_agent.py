@@ -6,20 +6,181 @@ DR-Prostate-CLI Agent
 
 import os
 import sys
+import hashlib
 import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Any, Optional
+import numpy as np
 import chromadb
 from chromadb.config import Settings
+from chromadb.errors import ChromaError
 from langchain_ollama import OllamaLLM
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_community.embeddings import OllamaEmbeddings
 import ollama
 
+def _file_sha256(path: Path) -> str:
+    """파일 전체를 메모리에 올리지 않고 SHA-256 계산"""
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        digest = hashlib.sha256()
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+        return digest.hexdigest()
+
+
+def _estimate_tokens(text: str) -> int:
+    """
+    대략적인 토큰 수 추정 (보수적으로 ASCII 문자 4개 ≈ 1토큰, 한글 등 비ASCII 문자 1개 ≈ 1토큰)
+    
+    Args:
+        text: 추정할 텍스트
+        
+    Returns:
+        추정 토큰 수
+    """
+    non_ascii = sum(1 for c in text if ord(c) > 127)
+    return (len(text) - non_ascii + 3) // 4 + non_ascii
+
+
+class _QVCache:
+    """질문 임베딩 기반 시맨틱 캐시 (코사인 유사도가 임계값 이상이면 적중, TTL 만료 + LRU 제거)"""
+    
+    def __init__(self, capacity: int = 256, threshold: float = 0.95, ttl_seconds: float = 600):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        # 질문 해시 -> (정규화된 질문 임베딩, 저장값), 최근 사용 순서 유지
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        # 유사도 계산용 임베딩 행렬 (항목 변경 시 재구성)
+        self.E: Optional[np.ndarray] = None
+        self._keys: List[bytes] = []
+        self._lock = threading.RLock()
+        # 캐시 통계
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _hit(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """적중 항목 반환 (TTL이 지난 항목은 제거 후 None)"""
+        payload = self._entries[key][1]
+        if time.monotonic() - payload['ts'] > self.ttl_seconds:
+            del self._entries[key]
+            self.E = None
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload
+    
+    def get_exact(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """같은 질문(해시 일치) 조회 - 실패 시 유사 질문 조회가 이어지므로 miss로 세지 않음"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            return self._hit(key)
+    
+    def lookup(self, q: np.ndarray) -> Optional[Dict[str, Any]]:
+        """가장 유사한 캐시 질문이 임계값 이상이면 저장값 반환"""
+        with self._lock:
+            payload = None
+            if self._entries:
+                if self.E is None:
+                    self._keys = list(self._entries.keys())
+                    self.E = np.stack([self._entries[k][0] for k in self._keys])
+                sims = self.E @ q
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    payload = self._hit(self._keys[best])
+            if payload is None:
+                self.misses += 1
+            return payload
+    
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+    
+    def put(self, key: bytes, q: np.ndarray, payload: Dict[str, Any]):
+        """항목 저장 (용량 초과 시 가장 오래 사용하지 않은 항목 제거)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            payload['ts'] = time.monotonic()
+            self._entries[key] = (q, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self.E = None
+    
+    def stats(self) -> Dict[str, int]:
+        """캐시 통계 반환"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
 class ProstateAgent:
     """전립선 질환 전문 AI 에이전트"""
     
+    # 답변 생성 프롬프트 템플릿 ({context}: 검색 문서, {question}: 환자 질문)
+    # 정적 지침을 앞에 두고 동적 내용은 끝에 배치 - 매 호출마다 접두부가 동일해
+    # Ollama가 이전 요청의 KV 캐시(프롬프트 접두부)를 재사용할 수 있음
+    _PROMPT_TMPL = """
+당신은 전립선 질환 전문 AI 의사입니다. EAU (European Association of Urology) 전립선암 가이드라인 2025를 기반으로 정확하고 전문적인 의료 정보를 제공합니다.
+
+**응답 지침:**
+1. EAU 가이드라인 2025를 우선적으로 참조하여 답변하세요
+2. 전립선암, 전립선비대증, 전립선염 등 전립선 관련 질환에 집중하세요
+3. 의학적으로 정확하고 근거 기반의 정보를 제공하세요
+4. 환자가 이해하기 쉽게 설명하되, 전문성을 유지하세요
+5. 진단, 치료, 관리 방법에 대해 체계적으로 설명하세요
+6. 필요시 PSA 검사, 생검, 영상검사 등의 정보를 포함하세요
+7. 반드시 전문 의료진과의 상담 필요성을 강조하세요
+
+**응답 형식:**
+🏥 **의료 정보**
+
+[구체적이고 체계적인 답변]
+
+**Disclaimer:** 저는 DR_PROSTATE로서 의료 자문을 제공하지만, 이는 전문적인 의학적 조언이 아닙니다. 반드시 urologists (전립선 전문의) 및 oncologists (종양 전문의)와 상담하여 개인에게 맞는 진단 및 치료 계획을 결정하십시오.
+
+⚠️ **의학적 주의사항**: 이 정보는 교육 목적으로만 제공됩니다. 실제 진단과 치료는 반드시 전문 의료진과 상담하시기 바랍니다.
+
+**참고 문서:**
+{context}
+
+**환자 질문:**
+{question}
+"""
+    
+    # LLM 컨텍스트 크기와 답변 길이 상한
+    _NUM_CTX = 4096
+    _NUM_PREDICT = 1024
+    # 질문/문서를 뺀 프롬프트 템플릿 토큰 수 (참고 문서 예산 = 컨텍스트 - 답변 - 템플릿 - 질문)
+    _PROMPT_TOKENS = _estimate_tokens(_PROMPT_TMPL)
+    # 참고 문서 하나당 "[Page N] " 머리와 구분자 토큰 여유분
+    _DOC_OVERHEAD_TOKENS = 8
+    
+    # 컬렉션 메타데이터 (HNSW 인덱스는 수천 개 청크 규모에 맞춰 설정)
+    _COLLECTION_METADATA = {
+        "description": "EAU Prostate Cancer Guidelines 2025",
+        "hnsw:space": "cosine",        # relevance = 1 - distance가 코사인 유사도가 되도록
+        "hnsw:M": 16,
+        "hnsw:construction_ef": 100,
+        "hnsw:search_ef": 64           # n_results=5 검색에 충분한 탐색 폭
+    }
+    
     def __init__(self, config):
         self.config = config
         self.logger = logging.getLogger(__name__)
@@ -38,6 +199,13 @@ class ProstateAgent:
         # ChromaDB 설정
         self.chroma_db_path = Path(__file__).parent.parent / "chroma_db_prostate"
         
+        # 답변 시맨틱 캐시 (비슷한 질문은 벡터 검색과 LLM 호출 생략)
+        self._qv_cache = _QVCache(
+            capacity=getattr(config, 'semantic_cache_size', 256),
+            threshold=getattr(config, 'semantic_cache_threshold', 0.95),
+            ttl_seconds=getattr(config, 'semantic_cache_ttl', 600)
+        )
+        
     def initialize(self) -> bool:
         """에이전트 초기화"""
         try:
@@ -52,7 +220,9 @@ class ProstateAgent:
             self.llm = OllamaLLM(
                 model=self.config.model_name,
                 temperature=0.1,
-                num_ctx=4096
+                num_ctx=self._NUM_CTX,
+                num_predict=self._NUM_PREDICT,  # 답변 길이 상한
+                keep_alive="30m"   # 모델과 KV 캐시를 메모리에 유지
             )
             
             # 임베딩 초기화
@@ -110,25 +280,35 @@ class ProstateAgent:
                 path=str(self.chroma_db_path),
                 settings=Settings(anonymized_telemetry=False)
             )
+            self._apply_sqlite_pragmas()
             
             # 컬렉션 가져오기 또는 생성
-            collection_name = "prostate_guidelines"
+            # get_or_create_collection(metadata=...)은 기존 컬렉션의 메타데이터(적재 상태/PDF 정보)를
+            # 덮어쓰고, hnsw:space는 생성 후 modify()로 바꿀 수 없으므로 인덱스 설정은 생성할 때만 전달
+            # (기존 컬렉션은 get_collection 한 번으로 열림)
             try:
-                self.collection = self.chroma_client.get_collection(collection_name)
-                self.logger.info("기존 전립선 가이드라인 컬렉션 로드됨")
-                
-                # 컬렉션이 비어있는지 확인
-                if self.collection.count() == 0:
-                    self.logger.info("컬렉션이 비어있어 PDF 문서를 다시 처리합니다")
-                    return self._process_pdf_documents()
-                    
-            except Exception:
-                # 컬렉션이 없으면 새로 생성
-                self.logger.info("새로운 전립선 가이드라인 컬렉션 생성")
+                self.collection = self.chroma_client.get_collection("prostate_guidelines")
+            except (ValueError, ChromaError):  # 0.4.x는 ValueError, 이후 버전은 ChromaError 계열
                 self.collection = self.chroma_client.create_collection(
-                    name=collection_name,
-                    metadata={"description": "EAU Prostate Cancer Guidelines 2025"}
+                    name="prostate_guidelines",
+                    metadata=self._COLLECTION_METADATA
                 )
+            
+            # 새로 생성되었거나 비어있는 컬렉션
+            if self.collection.count() == 0:
+                self.logger.info("전립선 가이드라인 컬렉션이 비어있어 PDF 문서를 처리합니다")
+                return self._process_pdf_documents()
+            
+            self.logger.info("기존 전립선 가이드라인 컬렉션 로드됨")
+            
+            # PDF가 마지막 적재 이후 변경되었으면 바뀐 청크만 다시 처리
+            if self._pdf_changed():
+                self.logger.info("PDF 파일이 변경되어 변경된 청크를 갱신합니다")
+                return self._process_pdf_documents()
+            
+            # 이전 적재가 중간에 실패했는지 확인
+            if not (self.collection.metadata or {}).get("ingest_complete"):
+                self.logger.info("이전 PDF 처리가 완료되지 않아 이어서 처리합니다")
                 return self._process_pdf_documents()
             
             return True
@@ -137,6 +317,44 @@ class ProstateAgent:
             self.logger.error(f"벡터 데이터베이스 설정 실패: {str(e)}")
             return False
     
+    def _mark_ingest_complete(self):
+        """적재 완료 및 PDF 정보(mtime, sha256)를 컬렉션 메타데이터에 기록"""
+        # hnsw:* 설정은 변경할 수 없으므로 제외
+        metadata = {k: v for k, v in (self.collection.metadata or {}).items() if not k.startswith("hnsw:")}
+        metadata["ingest_complete"] = True
+        metadata["pdf_mtime"] = self.pdf_path.stat().st_mtime
+        metadata["pdf_sha256"] = _file_sha256(self.pdf_path)
+        self.collection.modify(metadata=metadata)
+    
+    def _pdf_changed(self) -> bool:
+        """
+        컬렉션에 기록된 PDF 정보(mtime, sha256)와 현재 파일 비교
+        
+        Returns:
+            기록된 PDF와 내용이 다르면 True (기록이 없거나 파일이 없으면 False)
+        """
+        metadata = self.collection.metadata or {}
+        stored_sha256 = metadata.get("pdf_sha256")
+        if not stored_sha256 or not self.pdf_path.exists():
+            return False
+        
+        # 수정 시간이 같으면 해시 계산 생략
+        if metadata.get("pdf_mtime") == self.pdf_path.stat().st_mtime:
+            return False
+        return _file_sha256(self.pdf_path) != stored_sha256
+    
+    def _apply_sqlite_pragmas(self):
+        """Chroma SQLite 연결에 대량 적재용 PRAGMA 적용 (WAL 유지, fsync 횟수 감소)"""
+        try:
+            # Chroma 내부 API - 버전에 따라 없을 수 있으므로 실패해도 무시
+            from chromadb.db.impl.sqlite import SqliteDB
+            conn = self.chroma_client._system.instance(SqliteDB)._conn_pool.connect()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+        except Exception as e:
+            self.logger.debug(f"SQLite PRAGMA 적용 생략: {str(e)}")
+    
     def _process_pdf_documents(self) -> bool:
         """PDF 문서 처리 및 벡터화"""
         try:
@@ -146,12 +364,6 @@ class ProstateAgent:
             
             self.logger.info(f"PDF 문서 처리 중: {self.pdf_path}")
             
-            # PDF 로드
-            loader = PyPDFLoader(str(self.pdf_path))
-            documents = loader.load()
-            
-            self.logger.info(f"PDF에서 {len(documents)} 페이지 로드됨")
-            
             # 텍스트 분할
             text_splitter = RecursiveCharacterTextSplitter(
                 chunk_size=1000,
@@ -160,31 +372,39 @@ class ProstateAgent:
                 separators=["\n\n", "\n", ". ", " ", ""]
             )
             
-            texts = text_splitter.split_documents(documents)
-            self.logger.info(f"{len(texts)} 개의 텍스트 청크 생성됨")
-            
-            # 배치 처리로 임베딩 생성 및 저장
-            batch_size = 50
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i:i + batch_size]
-                
-                # 텍스트와 메타데이터 준비
-                batch_texts = [doc.page_content for doc in batch]
-                batch_metadatas = [doc.metadata for doc in batch]
-                batch_ids = [f"prostate_doc_{i + j}" for j in range(len(batch))]
-                
-                # 임베딩 생성
-                self.logger.info(f"배치 {i//batch_size + 1}/{(len(texts)-1)//batch_size + 1} 임베딩 생성 중...")
-                batch_embeddings = self.embeddings.embed_documents(batch_texts)
+            # 페이지 단위로 읽어 분할하고, 청크가 batch_size만큼 쌓이면 임베딩/저장 후 비움
+            # (전체 페이지/청크를 메모리에 올리지 않음)
+            loader = PyPDFLoader(str(self.pdf_path))
+            batch_size = 250
+            embed_workers = max(1, getattr(self.config, 'embed_workers', 8))
+            buf = []
+            page_count = 0
+            chunk_count = 0
+            seen_ids = set()
+            with ThreadPoolExecutor(max_workers=embed_workers) as executor:
+                for page in loader.lazy_load():
+                    page_count += 1
+                    buf.extend(text_splitter.split_documents([page]))
+                    if len(buf) >= batch_size:
+                        self._add_chunk_batch(executor, buf, seen_ids)
+                        chunk_count += len(buf)
+                        buf.clear()
                 
-                # ChromaDB에 추가
-                self.collection.add(
-                    documents=batch_texts,
-                    embeddings=batch_embeddings,
-                    metadatas=batch_metadatas,
-                    ids=batch_ids
-                )
+                if buf:
+                    self._add_chunk_batch(executor, buf, seen_ids)
+                    chunk_count += len(buf)
+                    buf.clear()
+            
+            self.logger.info(f"PDF {page_count} 페이지에서 {chunk_count} 개의 텍스트 청크 생성됨")
             
+            # 현재 PDF에 없는 청크(이전 버전 PDF 또는 이전 ID 형식) 삭제
+            stale_ids = [doc_id for doc_id in self.collection.get(include=[])['ids'] if doc_id not in seen_ids]
+            for i in range(0, len(stale_ids), batch_size):
+                self.collection.delete(ids=stale_ids[i:i + batch_size])
+            if stale_ids:
+                self.logger.info(f"더 이상 PDF에 없는 {len(stale_ids)} 개의 청크 삭제됨")
+            
+            self._mark_ingest_complete()
             self.logger.info("PDF 문서 처리 및 벡터화 완료")
             return True
             
@@ -192,13 +412,145 @@ class ProstateAgent:
             self.logger.error(f"PDF 문서 처리 실패: {str(e)}")
             return False
     
+    def _add_chunk_batch(self, executor: ThreadPoolExecutor, batch: List[Any], seen_ids: set):
+        """
+        청크 배치 임베딩 후 ChromaDB에 저장 (Ollama 임베딩 요청은 스레드로 병렬 전송)
+        
+        ID는 청크 내용의 해시이므로 이미 저장된 청크(중단 후 재시작, 변경되지 않은 부분)는
+        임베딩하지 않고 건너뜀
+        
+        Args:
+            executor: 임베딩 요청용 스레드 풀
+            batch: 분할된 Document 목록
+            seen_ids: 이번 적재에서 처리한 청크 ID (갱신됨)
+        """
+        # 텍스트와 메타데이터 준비 (같은 내용의 청크는 하나만)
+        pending = {}
+        for doc in batch:
+            doc_id = hashlib.blake2b(doc.page_content.encode('utf-8'), digest_size=16).hexdigest()
+            if doc_id not in seen_ids and doc_id not in pending:
+                pending[doc_id] = doc
+        seen_ids.update(pending)
+        
+        if pending:
+            existing = set(self.collection.get(ids=list(pending), include=[])['ids'])
+            for doc_id in existing:
+                del pending[doc_id]
+        if not pending:
+            return
+        
+        batch_ids = list(pending)
+        batch_texts = [doc.page_content for doc in pending.values()]
+        batch_metadatas = [doc.metadata for doc in pending.values()]
+        
+        # 임베딩 생성
+        self.logger.info(f"청크 {len(batch_ids)} 개 임베딩 생성 중...")
+        batch_embeddings = list(executor.map(self._embed_document, batch_texts))
+        
+        # ChromaDB에 저장 (같은 ID는 덮어씀)
+        self.collection.upsert(
+            documents=batch_texts,
+            embeddings=batch_embeddings,
+            metadatas=batch_metadatas,
+            ids=batch_ids
+        )
+    
+    def _embed_document(self, text: str) -> List[float]:
+        """문서 청크 하나 임베딩 (embed_query와 달리 문서용 instruction 적용)"""
+        return self.embeddings.embed_documents([text])[0]
+    
+    def _lookup_cache(self, question: str):
+        """
+        같은/유사한 질문의 캐시 항목 조회
+        
+        Returns:
+            (캐시 항목 또는 None, 질문 해시, 정규화된 질문 임베딩, 원본 질문 임베딩)
+        """
+        # 캐시를 끈 경우(semantic_cache_size=0) 검색용 임베딩만 생성
+        if not self._qv_cache.enabled:
+            return None, None, None, self.embeddings.embed_query(question)
+        
+        # 1. 같은 질문이면 임베딩 없이 바로 반환
+        question_key = hashlib.blake2b(question.encode()).digest()
+        cached = self._qv_cache.get_exact(question_key)
+        if cached is not None:
+            self.logger.info("캐시된 답변 사용 (동일 질문)")
+            return cached, question_key, None, None
+        
+        # 2. 질문을 한 번만 벡터화하여 유사 질문 조회와 벡터 검색(query_embeddings)에 함께 사용
+        question_embedding = self.embeddings.embed_query(question)
+        q = np.asarray(question_embedding, dtype=np.float32)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+        
+        cached = self._qv_cache.lookup(q)
+        if cached is not None:
+            self.logger.info("캐시된 답변 사용 (유사 질문)")
+        return cached, question_key, q, question_embedding
+    
+    def _build_context_docs(self, search_results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """검색 결과를 컨텍스트 문서 목록으로 변환"""
+        docs = search_results['documents'][0] if search_results['documents'] else []
+        if not docs:
+            return []
+        metadatas = search_results['metadatas'][0] or [{}] * len(docs)
+        distances = search_results['distances'][0] or [0.0] * len(docs)
+        
+        # 거리를 관련성으로 변환 (float64로 계산해 기존 1 - distance 값과 동일, tolist()로 Python float 유지)
+        relevances = (1.0 - np.asarray(distances, dtype=np.float64)).tolist()
+        context_docs = [
+            {
+                'content': doc,
+                'page': metadata.get('page', 'Unknown'),
+                'source': metadata.get('source', 'Unknown'),
+                'relevance': relevance
+            }
+            for doc, metadata, relevance in zip(docs, metadatas, relevances)
+        ]
+        return context_docs
+    
+    def _select_context_docs(self, context_docs: List[Dict[str, Any]], question: str) -> List[Dict[str, Any]]:
+        """
+        프롬프트에 넣을 문서 선택 (같은 페이지의 중복 청크 제거, 관련성 높은 순으로 토큰 예산까지)
+        
+        예산은 num_ctx에서 답변(num_predict), 프롬프트 템플릿, 질문 토큰을 뺀 나머지
+        
+        Args:
+            context_docs: 검색된 컨텍스트 문서 목록
+            question: 환자 질문
+            
+        Returns:
+            선택된 문서 목록 (관련성 내림차순)
+        """
+        budget = self._NUM_CTX - self._NUM_PREDICT - self._PROMPT_TOKENS - _estimate_tokens(question)
+        selected = []
+        seen = set()
+        used_tokens = 0
+        for doc in sorted(context_docs, key=lambda d: d['relevance'], reverse=True):
+            key = (doc['page'], doc['content'][:64])
+            if key in seen:
+                continue
+            tokens = _estimate_tokens(doc['content']) + self._DOC_OVERHEAD_TOKENS
+            if used_tokens + tokens > budget:
+                continue
+            seen.add(key)
+            used_tokens += tokens
+            selected.append(doc)
+        return selected
+    
     def ask_question(self, question: str) -> Dict[str, Any]:
         """질문에 대한 답변 생성"""
         try:
             self.logger.info(f"질문 처리 중: {question[:100]}...")
             
-            # 질문을 벡터화하여 관련 문서 검색
-            question_embedding = self.embeddings.embed_query(question)
+            # 같은/유사한 질문은 캐시된 답변 반환 (벡터 검색 + LLM 호출 생략)
+            cached, question_key, q, question_embedding = self._lookup_cache(question)
+            if cached is not None:
+                return {
+                    'success': True,
+                    'answer': cached['answer'],
+                    'sources': self._build_context_docs(cached['results']),
+                    'question': question
+                }
             
             # 유사한 문서 검색
             search_results = self.collection.query(
@@ -208,56 +560,24 @@ class ProstateAgent:
             )
             
             # 검색된 문서들을 컨텍스트로 구성
-            context_docs = []
-            if search_results['documents'] and search_results['documents'][0]:
-                for i, doc in enumerate(search_results['documents'][0]):
-                    metadata = search_results['metadatas'][0][i] if search_results['metadatas'][0] else {}
-                    distance = search_results['distances'][0][i] if search_results['distances'][0] else 0
-                    
-                    context_docs.append({
-                        'content': doc,
-                        'page': metadata.get('page', 'Unknown'),
-                        'source': metadata.get('source', 'Unknown'),
-                        'relevance': 1 - distance  # 거리를 관련성으로 변환
-                    })
-            
-            # 컨텍스트 텍스트 구성
-            context_text = "\n\n".join([f"[Page {doc['page']}] {doc['content']}" for doc in context_docs])
-            
-            # 프롬프트 구성
-            prompt = f"""
-당신은 전립선 질환 전문 AI 의사입니다. EAU (European Association of Urology) 전립선암 가이드라인 2025를 기반으로 정확하고 전문적인 의료 정보를 제공합니다.
-
-**참고 문서:**
-{context_text}
-
-**환자 질문:**
-{question}
-
-**응답 지침:**
-1. EAU 가이드라인 2025를 우선적으로 참조하여 답변하세요
-2. 전립선암, 전립선비대증, 전립선염 등 전립선 관련 질환에 집중하세요
-3. 의학적으로 정확하고 근거 기반의 정보를 제공하세요
-4. 환자가 이해하기 쉽게 설명하되, 전문성을 유지하세요
-5. 진단, 치료, 관리 방법에 대해 체계적으로 설명하세요
-6. 필요시 PSA 검사, 생검, 영상검사 등의 정보를 포함하세요
-7. 반드시 전문 의료진과의 상담 필요성을 강조하세요
-
-**응답 형식:**
-🏥 **의료 정보**
-
-[구체적이고 체계적인 답변]
-
-**Disclaimer:** 저는 DR_PROSTATE로서 의료 자문을 제공하지만, 이는 전문적인 의학적 조언이 아닙니다. 반드시 urologists (전립선 전문의) 및 oncologists (종양 전문의)와 상담하여 개인에게 맞는 진단 및 치료 계획을 결정하십시오.
-
-⚠️ **의학적 주의사항**: 이 정보는 교육 목적으로만 제공됩니다. 실제 진단과 치료는 반드시 전문 의료진과 상담하시기 바랍니다.
-"""
+            context_docs = self._build_context_docs(search_results)
+            
+            # 컨텍스트 텍스트 구성 (중복 제거 + 토큰 예산 내 문서만)
+            context_text = "\n\n".join(
+                f"[Page {doc['page']}] {doc['content']}" for doc in self._select_context_docs(context_docs, question)
+            )
+            
+            # 프롬프트 구성 (정적 지침은 클래스 템플릿, 검색 문서와 질문만 채움)
+            prompt = self._PROMPT_TMPL.format(context=context_text, question=question)
             
             # LLM을 사용해 답변 생성
             response = self.llm.invoke(prompt)
             
             self.logger.info("답변 생성 완료")
             
+            # 검색 결과(top-k 문서)와 답변을 함께 캐시
+            self._qv_cache.put(question_key, q, {'results': search_results, 'answer': response})
+            
             return {
                 'success': True,
                 'answer': response,
@@ -280,7 +600,8 @@ class ProstateAgent:
                 'ollama_connected': False,
                 'model_available': False,
                 'pdf_loaded': False,
-                'vectordb_ready': False
+                'vectordb_ready': False,
+                'answer_cache': self._qv_cache.stats()
             }
             
             # Ollama 연결 확인
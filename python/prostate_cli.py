@@ -233,6 +233,9 @@ class ProstateCLI:
             print(f"  • Model: {'Available' if status.get('model_available') else 'Not available'}")
             print(f"  • PDF document: {'Loaded' if status.get('pdf_loaded') else 'Not loaded'}")
             print(f"  • Vector DB: {'Ready' if status.get('vectordb_ready') else 'Not ready'}")
+            cache_stats = status.get('answer_cache')
+            if cache_stats:
+                print(f"  • Answer cache: {cache_stats['size']} entries, {cache_stats['hits']} hits / {cache_stats['misses']} misses")
             
             # 설정 정보
             print(f"\n{Fore.CYAN}Configuration:{Style.RESET_ALL}")
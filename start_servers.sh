@@ -19,6 +19,9 @@ NC='\033[0m' # No Color
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 cd "$SCRIPT_DIR"
 
+# agents 패키지 임포트 경로 (pip install -e . 로 설치하지 않은 경우 대비)
+export PYTHONPATH="$SCRIPT_DIR${PYTHONPATH:+:$PYTHONPATH}"
+
 echo -e "${WHITE}🚀 AI Medical A2A Consultation System 시작${NC}"
 echo -e "${WHITE}================================================${NC}"
 
@@ -45,6 +48,15 @@ if ! ollama list | grep -q "gemma3:4b"; then
 fi
 echo -e "${GREEN}✅ gemma3:4b 모델 확인 완료${NC}"
 
+# 에이전트 분석 모델 확인 (DR_MODEL, 기본: gemma3:4b-it-q4_K_M)
+DR_MODEL="${DR_MODEL:-gemma3:4b-it-q4_K_M}"
+echo -e "${CYAN}🔍 ${DR_MODEL} 모델 확인 중...${NC}"
+if ! ollama list | grep -q "${DR_MODEL}"; then
+    echo -e "${YELLOW}⚠️ ${DR_MODEL} 모델이 없습니다. 설치 중...${NC}"
+    ollama pull "${DR_MODEL}" || echo -e "${YELLOW}⚠️ ${DR_MODEL} 설치 실패 - 에이전트는 gemma3:4b를 사용합니다${NC}"
+fi
+export DR_MODEL
+
 # 기존 프로세스 정리
 echo -e "${YELLOW}🧹 기존 서버 프로세스 정리 중...${NC}"
 pkill -f "main_bladder.py" 2>/dev/null || true
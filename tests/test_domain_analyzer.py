@@ -0,0 +1,164 @@
+"""
+agents/shared/domain_analyzer.py 및 에이전트 /ask 오류 처리 테스트 (ollama 미설치 환경에서는 건너뜀)
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+for _module in ("ollama", "cachetools", "chromadb", "langchain", "langchain_community"):
+    pytest.importorskip(_module)
+
+import ollama  # noqa: E402
+
+import agents.shared.domain_analyzer as domain_analyzer  # noqa: E402
+from agents.shared.domain_analyzer import AnalysisError, DomainAnalyzer  # noqa: E402
+
+
+class FakeAsyncClient:
+    """Ollama AsyncClient 대역: 지정한 토큰을 스트리밍하거나 오류 발생"""
+
+    def __init__(self, tokens=(), error=None):
+        self.tokens = list(tokens)
+        self.error = error
+        self.messages = []
+
+    async def chat(self, model, messages, stream=False, **kwargs):
+        self.messages.append(messages)
+        if self.error and not self.tokens:
+            raise self.error
+
+        async def chunks():
+            for token in self.tokens:
+                yield {'message': {'content': token}}
+            if self.error:
+                raise self.error
+
+        return chunks()
+
+
+class SampleAnalyzer(DomainAnalyzer):
+    DOMAIN = "sample"
+    SYSTEM_PROMPT = "You are a test assistant."
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setattr(domain_analyzer, "get_vector_db", lambda: None)
+    monkeypatch.setattr(SampleAnalyzer, "validate_ollama_connection", lambda self: True)
+    return SampleAnalyzer(model_name="test-model")
+
+
+def _collect(analyzer, question):
+    async def main():
+        return [part async for part in analyzer.stream_question(question)]
+    return asyncio.run(main())
+
+
+def test_stream_returns_prefix_tokens_and_disclaimer_and_caches(analyzer):
+    analyzer.async_client = FakeAsyncClient(tokens=["PSA ", "answer"])
+
+    parts = _collect(analyzer, "PSA?")
+
+    assert parts == [DomainAnalyzer._DEFAULT_PREFIX, "PSA ", "answer", DomainAnalyzer.DISCLAIMER]
+    assert analyzer._get_cached_answer("psa?") == "PSA answer"
+
+
+@pytest.mark.parametrize("error", [ollama.ResponseError("model not found"), ConnectionError("refused")])
+def test_ollama_failure_raises_and_is_not_cached(analyzer, error):
+    """Ollama 실패는 답변 텍스트가 아닌 AnalysisError로 전달되고 캐시되지 않음"""
+    analyzer.async_client = FakeAsyncClient(error=error)
+
+    with pytest.raises(AnalysisError):
+        asyncio.run(analyzer.aanalyze_question("PSA?"))
+    assert analyzer._get_cached_answer("PSA?") is None
+
+
+def test_failure_mid_stream_is_not_cached(analyzer):
+    """일부 토큰 전송 후 실패해도 잘린 답변을 캐시하지 않음"""
+    analyzer.async_client = FakeAsyncClient(tokens=["partial"], error=ConnectionError("reset"))
+
+    with pytest.raises(AnalysisError):
+        _collect(analyzer, "PSA?")
+    assert analyzer._get_cached_answer("PSA?") is None
+
+
+def test_system_message_is_immutable_and_shared(analyzer):
+    """요청마다 같은 system 메시지를 쓰고, 수정 시도는 실패해 다음 요청에 영향 없음"""
+    first = analyzer._build_messages("q1")
+    second = analyzer._build_messages("q2", context="ctx")
+
+    assert first[0] is second[0]
+    with pytest.raises(TypeError):
+        first[0]['content'] = "changed"
+    assert analyzer._build_messages("q3")[0]['content'] == SampleAnalyzer.SYSTEM_PROMPT
+
+
+def test_cached_answer_skips_ollama_and_retrieval(analyzer):
+    """정규화된 같은 질문은 Ollama와 벡터 검색 없이 캐시된 답변으로 응답"""
+    analyzer.async_client = FakeAsyncClient(tokens=["cached answer"])
+    first = asyncio.run(analyzer.aanalyze_question("What is PSA?"))
+
+    analyzer._retrieve_context = lambda question: pytest.fail("retrieval should be skipped")
+    second = asyncio.run(analyzer.aanalyze_question("  what is psa?"))
+
+    assert len(analyzer.async_client.messages) == 1
+    assert first.endswith("cached answer" + DomainAnalyzer.DISCLAIMER)
+    assert second == first
+
+
+def test_context_sent_as_separate_system_message(analyzer):
+    analyzer.vector_db = None
+    analyzer._retrieve_context = lambda question: "guideline excerpt"
+    analyzer.async_client = FakeAsyncClient(tokens=["ok"])
+
+    asyncio.run(analyzer.aanalyze_question("PSA?"))
+
+    roles = [message['role'] for message in analyzer.async_client.messages[0]]
+    assert roles == ['system', 'system', 'user']
+    assert analyzer.async_client.messages[0][1]['content'].startswith("guideline excerpt")
+
+
+# --- 에이전트 API (/ask) ---
+
+@pytest.fixture
+def prostate_api(monkeypatch, analyzer):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    monkeypatch.syspath_prepend(str(Path(__file__).resolve().parents[1] / "agents" / "prostate"))
+    sys.modules.pop("main_prostate", None)
+    import main_prostate
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main_prostate, "get_analyzer", lambda: analyzer)
+    return TestClient(main_prostate.app)
+
+
+def test_ask_returns_502_when_generation_fails(prostate_api, analyzer):
+    analyzer.async_client = FakeAsyncClient(error=ollama.ResponseError("model not found"))
+
+    response = prostate_api.post("/ask", json={"question": "PSA?"})
+
+    assert response.status_code == 502
+    assert "model not found" in response.json()["detail"]
+
+
+def test_ask_stream_ends_with_error_event_when_generation_fails(prostate_api, analyzer):
+    analyzer.async_client = FakeAsyncClient(tokens=["partial"], error=ConnectionError("reset"))
+
+    response = prostate_api.post("/ask?stream=true", json={"question": "PSA?"})
+
+    body = response.text
+    assert "data: partial" in body
+    assert body.rstrip().split("\n\n")[-1].startswith("event: error")
+    assert "event: end" not in body
+
+
+def test_ask_stream_ends_with_end_event(prostate_api, analyzer):
+    analyzer.async_client = FakeAsyncClient(tokens=["ok"])
+
+    response = prostate_api.post("/ask?stream=true", json={"question": "PSA?"})
+
+    assert response.text.endswith("event: end\ndata: \n\n")
@@ -0,0 +1,182 @@
+"""
+python/prostate_agent.py 테스트 (chromadb/langchain/ollama 미설치 환경에서는 건너뜀)
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+for _module in ("numpy", "chromadb", "ollama", "langchain_ollama", "langchain_community", "langchain"):
+    pytest.importorskip(_module)
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "python"))
+from prostate_agent import ProstateAgent, _estimate_tokens  # noqa: E402
+
+
+def _make_agent(tmp_path: Path) -> ProstateAgent:
+    agent = ProstateAgent(SimpleNamespace(model_name="test-model"))
+    agent.chroma_db_path = tmp_path / "chroma"
+    agent.pdf_path = tmp_path / "guideline.pdf"
+    return agent
+
+
+def test_ingest_state_survives_reopen(tmp_path):
+    """컬렉션을 다시 열어도 적재 완료 표시가 유지되어 PDF를 다시 처리하지 않음"""
+    (tmp_path / "guideline.pdf").write_bytes(b"%PDF-1.4 test")
+    calls = []
+
+    first = _make_agent(tmp_path)
+
+    def fake_process():
+        calls.append("first")
+        first.collection.upsert(ids=["a"], documents=["doc"], embeddings=[[0.1, 0.2, 0.3]])
+        first._mark_ingest_complete()
+        return True
+
+    first._process_pdf_documents = fake_process
+    assert first._setup_vector_database()
+    assert calls == ["first"]
+
+    second = _make_agent(tmp_path)
+    second._process_pdf_documents = lambda: calls.append("second") or True
+    assert second._setup_vector_database()
+
+    assert calls == ["first"]
+    metadata = second.collection.metadata
+    assert metadata["ingest_complete"]  # chromadb 0.4.x는 bool을 int로 저장
+    assert metadata["pdf_sha256"]
+
+
+def test_new_collection_uses_cosine_distance(tmp_path):
+    """새 컬렉션은 생성 시 전달한 hnsw:space=cosine으로 인덱싱됨 (relevance = 1 - distance)"""
+    agent = _make_agent(tmp_path)
+    agent._process_pdf_documents = lambda: True
+    assert agent._setup_vector_database()
+
+    agent.collection.add(ids=["a"], documents=["doc"], embeddings=[[10.0, 0.0]])
+    result = agent.collection.query(query_embeddings=[[1.0, 0.0]], n_results=1)
+
+    assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-6)
+
+
+def _doc(page, content, relevance):
+    return {'content': content, 'page': page, 'source': 'guideline.pdf', 'relevance': relevance}
+
+
+def test_select_context_docs_trims_to_token_budget(tmp_path):
+    """참고 문서가 num_ctx - num_predict - 템플릿 - 질문 예산을 넘으면 관련성 낮은 문서부터 제외"""
+    agent = _make_agent(tmp_path)
+    question = "PSA 검사는 언제 받아야 하나요?"
+    docs = [_doc(page, f"chunk {page} " + "x" * 3000, 0.9 - page * 0.1) for page in range(5)]
+
+    selected = agent._select_context_docs(docs, question)
+
+    budget = (ProstateAgent._NUM_CTX - ProstateAgent._NUM_PREDICT
+              - ProstateAgent._PROMPT_TOKENS - _estimate_tokens(question))
+    assert 0 < len(selected) < len(docs)
+    assert [doc['page'] for doc in selected] == list(range(len(selected)))
+    used = sum(_estimate_tokens(doc['content']) + ProstateAgent._DOC_OVERHEAD_TOKENS for doc in selected)
+    assert used <= budget
+
+
+def test_select_context_docs_drops_duplicate_chunks(tmp_path):
+    """같은 페이지의 같은 청크는 한 번만 포함"""
+    agent = _make_agent(tmp_path)
+    docs = [_doc(3, "same text", 0.9), _doc(3, "same text", 0.8), _doc(4, "other text", 0.7)]
+
+    selected = agent._select_context_docs(docs, "question")
+
+    assert [doc['relevance'] for doc in selected] == [0.9, 0.7]
+
+
+class FakeEmbeddings:
+    """OllamaEmbeddings 대역: 임베딩한 텍스트를 기록"""
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+
+def _use_pages(monkeypatch, pages):
+    """PyPDFLoader 대신 pages 리스트의 현재 내용을 페이지로 돌려주는 로더 사용"""
+    from langchain_core.documents import Document
+    import prostate_agent
+
+    class FakeLoader:
+        def __init__(self, path):
+            self.path = path
+
+        def lazy_load(self):
+            for i, text in enumerate(pages):
+                yield Document(page_content=text, metadata={"source": self.path, "page": i})
+
+    monkeypatch.setattr(prostate_agent, "PyPDFLoader", FakeLoader)
+
+
+def _ingest_agent(tmp_path, embeddings):
+    agent = _make_agent(tmp_path)
+    agent.embeddings = embeddings
+    assert agent._setup_vector_database()
+    return agent
+
+
+def test_reingest_unchanged_pdf_embeds_nothing(tmp_path, monkeypatch):
+    """같은 PDF를 다시 적재하면 임베딩 호출 없이 기존 청크를 그대로 사용"""
+    pages = ["alpha page", "beta page", "alpha page", "gamma page"]
+    _use_pages(monkeypatch, pages)
+    (tmp_path / "guideline.pdf").write_bytes(b"%PDF-1.4 v1")
+
+    first = FakeEmbeddings()
+    agent = _ingest_agent(tmp_path, first)
+    assert sorted(first.embedded) == ["alpha page", "beta page", "gamma page"]  # 중복 청크는 한 번만
+    ids = sorted(agent.collection.get(include=[])["ids"])
+
+    again = FakeEmbeddings()
+    agent.embeddings = again
+    assert agent._process_pdf_documents()
+
+    assert again.embedded == []
+    assert sorted(agent.collection.get(include=[])["ids"]) == ids
+
+
+def test_changed_pdf_embeds_only_new_chunks_and_deletes_stale(tmp_path, monkeypatch):
+    """PDF가 바뀌면 새 청크만 임베딩하고 PDF에서 사라진 청크는 삭제"""
+    pages = ["alpha page", "beta page", "gamma page"]
+    _use_pages(monkeypatch, pages)
+    pdf = tmp_path / "guideline.pdf"
+    pdf.write_bytes(b"%PDF-1.4 v1")
+    _ingest_agent(tmp_path, FakeEmbeddings())
+
+    pages[2] = "delta page"
+    pdf.write_bytes(b"%PDF-1.4 v2")
+    second = FakeEmbeddings()
+    agent = _ingest_agent(tmp_path, second)
+
+    assert second.embedded == ["delta page"]
+    stored = agent.collection.get(include=["documents"])
+    assert sorted(stored["documents"]) == ["alpha page", "beta page", "delta page"]
+    assert agent.collection.metadata["ingest_complete"]
+    assert not agent._pdf_changed()
+
+
+def test_chunk_ids_are_content_hashes(tmp_path, monkeypatch):
+    """청크 ID는 페이지 위치가 아닌 내용 해시라 페이지가 밀려도 같은 ID 유지"""
+    pages = ["alpha page", "beta page"]
+    _use_pages(monkeypatch, pages)
+    pdf = tmp_path / "guideline.pdf"
+    pdf.write_bytes(b"%PDF-1.4 v1")
+    agent = _ingest_agent(tmp_path, FakeEmbeddings())
+    ids = set(agent.collection.get(include=[])["ids"])
+
+    pages.insert(0, "new first page")
+    pdf.write_bytes(b"%PDF-1.4 v2")
+    second = FakeEmbeddings()
+    agent = _ingest_agent(tmp_path, second)
+
+    assert second.embedded == ["new first page"]
+    assert ids < set(agent.collection.get(include=[])["ids"])
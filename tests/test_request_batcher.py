@@ -0,0 +1,99 @@
+"""
+agents/shared/request_batcher.py 테스트
+"""
+
+import asyncio
+
+import pytest
+
+from agents.shared.request_batcher import RequestBatcher
+
+
+def test_same_question_in_flight_calls_handler_once():
+    """처리 중인 같은 질문은 handler를 한 번만 호출하고 결과를 공유"""
+    calls = []
+
+    async def handler(question):
+        calls.append(question)
+        await asyncio.sleep(0.01)
+        return f"answer: {question}"
+
+    async def main():
+        batcher = RequestBatcher(handler)
+        await batcher.start()
+        results = await asyncio.gather(
+            batcher.submit("psa"), batcher.submit("psa"), batcher.submit("mri")
+        )
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(main()) == ["answer: psa", "answer: psa", "answer: mri"]
+    assert sorted(calls) == ["mri", "psa"]
+
+
+def test_finished_question_is_not_reused():
+    """완료된 질문은 공유하지 않고 다음 요청에서 다시 처리"""
+    calls = []
+
+    async def handler(question):
+        calls.append(question)
+        return str(len(calls))
+
+    async def main():
+        batcher = RequestBatcher(handler)
+        return [await batcher.submit("psa"), await batcher.submit("psa")]
+
+    assert asyncio.run(main()) == ["1", "2"]
+
+
+def test_handler_error_reaches_every_waiter():
+    """handler 오류는 같은 질문을 기다리던 모든 호출자에게 전달"""
+    async def handler(question):
+        await asyncio.sleep(0.01)
+        raise ValueError("ollama down")
+
+    async def main():
+        batcher = RequestBatcher(handler)
+        return await asyncio.gather(
+            batcher.submit("psa"), batcher.submit("psa"), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+
+
+def test_stop_fails_pending_requests():
+    """stop()은 처리 중인 요청을 기다리던 호출자에게 오류를 전달 (무한 대기 방지)"""
+    async def handler(question):
+        await asyncio.sleep(10)
+        return "late"
+
+    async def main():
+        batcher = RequestBatcher(handler)
+        await batcher.start()
+        pending = asyncio.ensure_future(batcher.submit("psa"))
+        await asyncio.sleep(0)
+        await batcher.stop()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(pending, 1)
+        with pytest.raises(RuntimeError):
+            await batcher.submit("psa")
+
+    asyncio.run(main())
+
+
+def test_cancelled_caller_does_not_cancel_shared_request():
+    """한 호출자가 취소되어도 같은 질문을 기다리는 다른 호출자는 결과를 받음"""
+    async def handler(question):
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def main():
+        batcher = RequestBatcher(handler)
+        first = asyncio.ensure_future(batcher.submit("psa"))
+        second = asyncio.ensure_future(batcher.submit("psa"))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "answer"
@@ -0,0 +1,261 @@
+"""
+agents/shared/vector_db.py 테스트 (chromadb/langchain 미설치 환경에서는 건너뜀)
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+for _module in ("numpy", "chromadb", "diskcache", "langchain", "langchain_community"):
+    pytest.importorskip(_module)
+
+import numpy as np  # noqa: E402
+
+from agents.shared.vector_db import MedicalVectorDB  # noqa: E402
+
+
+class FakeEmbedder:
+    """텍스트마다 고정된 L2 정규화 벡터를 돌려주는 임베딩 모델 대역 (호출 횟수 기록)"""
+
+    def __init__(self, dim: int = 8):
+        self.dim = dim
+        self.encoded: list = []
+
+    def _vector(self, text: str) -> np.ndarray:
+        rng = np.random.default_rng(sum(text.encode()) + len(text))
+        vec = rng.standard_normal(self.dim).astype(np.float32)
+        return vec / np.linalg.norm(vec)
+
+    def encode(self, texts, **kwargs):
+        if isinstance(texts, str):
+            self.encoded.append(texts)
+            return self._vector(texts)
+        self.encoded.extend(texts)
+        return np.stack([self._vector(text) for text in texts])
+
+
+def _make_db(tmp_path, **kwargs) -> MedicalVectorDB:
+    db = MedicalVectorDB(db_path=str(tmp_path / "db"), **kwargs)
+    db._embedder = FakeEmbedder()
+    return db
+
+
+def _batch(source_type, texts, start=0):
+    return {
+        "texts": list(texts),
+        "metadatas": [{"source_type": source_type, "page": i} for i in range(len(texts))],
+        "ids": [f"{source_type}_{start + i}" for i in range(len(texts))],
+    }
+
+
+def test_reopen_keeps_collection_metadata(tmp_path):
+    """기존 컬렉션을 다시 열어도 메타데이터와 ip 거리 공간이 유지됨"""
+    db = _make_db(tmp_path)
+    db.collection.modify(metadata={"description": "guidelines", "hnsw:M": 32})
+
+    reopened = _make_db(tmp_path)
+
+    assert reopened.collection.metadata["description"] == "guidelines"
+    reopened.collection.add(ids=["a"], embeddings=[[2.0, 0.0]])
+    result = reopened.collection.query(query_embeddings=[[1.0, 0.0]], n_results=1)
+    assert result["distances"][0][0] == pytest.approx(-1.0)  # ip: 1 - 내적 (l2/cosine이면 1/0)
+
+
+def _populate(db):
+    db.add_chunks("bladder.pdf", "bladder", [_batch("bladder", [f"bladder text {i}" for i in range(12)])])
+    db.add_chunks("prostate.pdf", "prostate", [_batch("prostate", [f"prostate text {i}" for i in range(9)])])
+
+
+def test_int8_search_matches_float_ranking_with_source_filter(tmp_path, monkeypatch):
+    """int8 블록 점수 계산은 소스 타입 필터와 함께 float32 전수 검색과 같은 순위를 반환"""
+    import agents.shared.vector_db as vector_db
+    monkeypatch.setattr(vector_db, "INT8_SCORE_BLOCK", 4)  # 여러 블록에 걸친 계산 확인
+    db = _make_db(tmp_path)
+    _populate(db)
+
+    db.use_inmem_index = True
+    expected = db.search("prostate text 3", source_type="prostate", n_results=3)
+    db.use_inmem_index, db.use_int8_index = False, True
+    results = db.search("prostate text 3", source_type="prostate", n_results=3)
+
+    assert [r["id"] for r in results] == [r["id"] for r in expected]
+    assert all(r["metadata"]["source_type"] == "prostate" for r in results)
+    assert results[0]["distance"] == pytest.approx(expected[0]["distance"], abs=0.02)
+    assert db.search("x", source_type="kidney") == []
+
+
+def test_score_int8_blocks_match_full_product(monkeypatch):
+    """블록 단위 점수는 행렬 전체 내적과 같고 rows 순서를 따름"""
+    import agents.shared.vector_db as vector_db
+    monkeypatch.setattr(vector_db, "INT8_SCORE_BLOCK", 3)
+    rng = np.random.default_rng(0)
+    vectors = rng.integers(-127, 128, size=(10, 8), dtype=np.int8)
+    query = rng.integers(-127, 128, size=8).astype(np.float32)
+    rows = np.array([7, 1, 4, 9])
+
+    full = vectors.astype(np.int64) @ query.astype(np.int64)
+    assert vector_db._score_int8(vectors, query).tolist() == full.tolist()
+    assert vector_db._score_int8(vectors, query, rows).tolist() == full[rows].tolist()
+
+
+def test_construction_is_cheap(tmp_path):
+    """생성만 하면 torch/sentence_transformers 임포트, 임베딩 캐시 열기, 모델 로드를 하지 않음"""
+    code = (
+        "import sys\n"
+        "from agents.shared.vector_db import MedicalVectorDB\n"
+        f"db = MedicalVectorDB(db_path={str(tmp_path / 'db')!r})\n"
+        "assert 'torch' not in sys.modules and 'sentence_transformers' not in sys.modules\n"
+        "assert db._embedder is None and db._embedding_cache is None and db._client is None\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).resolve().parents[1])
+    assert not (tmp_path / "db" / "emb_cache").exists()
+
+
+def test_source_counts_stay_exact_on_reingest(tmp_path):
+    """같은 청크를 다시 적재해도 stats.json의 문서 수가 늘어나지 않음"""
+    db = _make_db(tmp_path)
+    db.clear_collection()  # stats.json 기준값 생성
+    _populate(db)
+    _populate(db)
+
+    assert db.get_stats()["source_types"] == {"bladder": 12, "prostate": 9}
+
+
+def test_source_counts_rebuilt_per_type_without_stats_file(tmp_path, monkeypatch):
+    """stats.json이 없으면 소스 타입별 ID 조회로 다시 계산 (메타데이터 전체 조회 없음)"""
+    db = _make_db(tmp_path)
+    _populate(db)
+    (tmp_path / "db" / "stats.json").unlink(missing_ok=True)
+
+    collection_get = type(db.collection).get
+    includes = []
+
+    def recording_get(self, *args, **kwargs):
+        includes.append(kwargs.get("include"))
+        return collection_get(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(db.collection), "get", recording_get)
+    assert db.get_stats()["source_types"] == {"bladder": 12, "prostate": 9}
+    assert includes == [[], []]
+
+
+def test_count_failure_does_not_mask_ingest_error(tmp_path):
+    """적재 후 문서 수 갱신이 실패해도 원래 적재 오류가 결과로 반환됨"""
+    db = _make_db(tmp_path)
+    db.clear_collection()
+
+    def failing_batches():
+        yield _batch("bladder", ["bladder text 0", "bladder text 1"])
+        raise ValueError("broken page")
+
+    def failing_count(source_type):
+        raise RuntimeError("chroma unavailable")
+
+    db._count_source_type = failing_count
+    result = db.add_chunks("bladder.pdf", "bladder", failing_batches())
+
+    assert result == {"status": "error", "error": "broken page"}
+    assert not (tmp_path / "db" / "stats.json").exists()
+
+
+def test_normalize_query_folds_case_and_width():
+    """NFKC + casefold로 대소문자/전각 문자 차이를 없애고 앞뒤 공백 제거"""
+    from agents.shared.vector_db import normalize_query
+
+    assert normalize_query("  PSA Ｔest ") == "psa test"
+    assert normalize_query("전립선 PSA") == "전립선 psa"
+    assert normalize_query("Psa") is normalize_query("psA")  # ASCII 질문은 intern
+
+
+def test_reingest_reuses_document_embedding_cache(tmp_path):
+    """같은 내용의 청크는 한 번만 임베딩하고, 다시 적재할 때는 디스크 캐시를 사용"""
+    db = _make_db(tmp_path)
+    texts = ["same chunk", "other chunk", "same chunk"]
+
+    db.add_chunks("a.pdf", "bladder", [_batch("bladder", texts)])
+    assert sorted(db._embedder.encoded) == ["other chunk", "same chunk"]
+
+    db.clear_collection()
+    db._embedder.encoded.clear()
+    result = db.add_chunks("a.pdf", "bladder", [_batch("bladder", texts)])
+
+    assert result["chunks_processed"] == 3
+    assert db._embedder.encoded == []
+
+
+def test_query_embedding_cached_in_memory_and_on_disk(tmp_path):
+    """쿼리 임베딩은 메모리 LRU, 디스크 캐시 순으로 재사용"""
+    db = _make_db(tmp_path)
+    first = db.embed_query("psa test")
+    assert db.embed_query("psa test") == first
+    assert db._embedder.encoded == ["psa test"]
+
+    reopened = _make_db(tmp_path)
+    assert reopened.embed_query("psa test") == pytest.approx(first)
+    assert reopened._embedder.encoded == []
+
+
+def test_context_cache_hit_and_invalidated_by_ingest(tmp_path, monkeypatch):
+    """같은(정규화된) 질문의 컨텍스트는 캐시에서 반환하고, 적재 후에는 다시 검색"""
+    db = _make_db(tmp_path)
+    _populate(db)
+    searches = []
+    search = db.search
+    monkeypatch.setattr(db, "search", lambda *args, **kwargs: searches.append(args) or search(*args, **kwargs))
+
+    context = db.get_context_for_prompt("Prostate text 1", source_type="prostate")
+    assert context.startswith("Based on the following medical guidelines")
+    assert db.get_context_for_prompt("  prostate TEXT 1 ", source_type="prostate") == context
+    assert len(searches) == 1
+
+    db.add_chunks("p.pdf", "prostate", [_batch("prostate", ["prostate text new"], start=100)])
+    db.get_context_for_prompt("prostate text 1", source_type="prostate")
+    assert len(searches) == 2
+
+
+def test_inmem_search_matches_chroma_and_reloads_after_ingest(tmp_path):
+    """메모리 전수 검색은 Chroma 검색과 같은 결과를 내고, 적재 후 새 문서를 포함"""
+    db = _make_db(tmp_path)
+    _populate(db)
+    expected = db.search("bladder text 5", source_type="bladder", n_results=4)
+
+    db.use_inmem_index = True
+    results = db.search("bladder text 5", source_type="bladder", n_results=4)
+
+    assert [r["id"] for r in results] == [r["id"] for r in expected]
+    assert [r["distance"] for r in results] == pytest.approx([r["distance"] for r in expected], abs=1e-5)
+
+    db.add_chunks("b.pdf", "bladder", [_batch("bladder", ["bladder text 5"], start=100)])
+    ids = [r["id"] for r in db.search("bladder text 5", source_type="bladder", n_results=2)]
+    assert "bladder_100" in ids
+
+
+def test_load_pdf_chunks_yields_bounded_batches_with_stable_ids(tmp_path, monkeypatch):
+    """PDF 청크는 batch_size 이하 배치로 생성되고 빈 페이지는 건너뛰며 ID는 내용 기준으로 고정"""
+    from langchain_core.documents import Document
+    import agents.shared.vector_db as vector_db
+
+    pages = [f"page {i} " + "text " * 50 for i in range(7)] + ["   "]
+
+    class FakeLoader:
+        def __init__(self, path):
+            self.path = path
+
+        def lazy_load(self):
+            for i, text in enumerate(pages):
+                yield Document(page_content=text, metadata={"page": i})
+
+    monkeypatch.setattr(vector_db, "PyPDFLoader", FakeLoader)
+    pdf = tmp_path / "g.pdf"
+    pdf.write_bytes(b"%PDF")
+
+    batches = list(vector_db.load_pdf_chunks(str(pdf), "bladder", batch_size=3))
+    again = list(vector_db.load_pdf_chunks(str(pdf), "bladder", batch_size=3))
+
+    assert [len(batch["texts"]) for batch in batches] == [3, 3, 1]
+    assert all(meta["source_type"] == "bladder" for batch in batches for meta in batch["metadatas"])
+    assert [batch["ids"] for batch in batches] == [batch["ids"] for batch in again]
+    with pytest.raises(FileNotFoundError):
+        next(vector_db.load_pdf_chunks(str(tmp_path / "missing.pdf"), "bladder"))
@@ -3,40 +3,65 @@ AI Medical A2A Consultation Web Interface
 Flask 기반 웹 애플리케이션
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for
+from flask.json.provider import DefaultJSONProvider
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import asyncio
 import aiohttp
 from datetime import datetime
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
 import time
 import markdown
-import re
+import orjson
+import os
+import threading
 
 # 로깅 설정
+# 요청 스레드는 큐에 레코드만 넣고, 콘솔/파일 출력은 백그라운드 리스너 스레드가 담당
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [logging.StreamHandler(), logging.FileHandler('flask_app.log')]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+_log_queue = queue.Queue(-1)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('flask_app.log')
-    ]
+    handlers=[QueueHandler(_log_queue)]
 )
+_log_listener = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)  # 종료 시 남은 로그 기록
 logger = logging.getLogger(__name__)
 
+class ORJSONProvider(DefaultJSONProvider):
+    """jsonify 등 Flask JSON 직렬화를 orjson으로 처리"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
 # Flask 요청 로깅 활성화
 @app.before_request
 def log_request_info():
-    logger.info(f"🌐 요청: {request.method} {request.url}")
-    if request.method == 'POST':
-        logger.info(f"📝 POST 데이터: {request.form}")
+    logger.info("🌐 요청: %s %s", request.method, request.url)
+    # 폼 전체 문자열화는 비용이 크므로 DEBUG 레벨에서만 수행
+    if request.method == 'POST' and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📝 POST 데이터: %s", request.form)
 
 @app.after_request
 def log_response_info(response):
-    logger.info(f"📤 응답: {response.status_code} for {request.url}")
+    logger.info("📤 응답: %s for %s", response.status_code, request.url)
     return response
 app.secret_key = 'medical_consultation_secret_key_2024'
 
@@ -45,6 +70,54 @@ ORCHESTRATOR_API = "http://localhost:8003"
 BLADDER_API = "http://localhost:8001"
 PROSTATE_API = "http://localhost:8002"
 
+# 백엔드 API 공용 HTTP 세션 (keep-alive 연결 재사용, 연결 실패 시에만 짧게 재시도)
+# 읽기 타임아웃/응답 상태는 재시도하지 않음 - 느린 오케스트레이터가 워커 스레드를 타임아웃의 몇 배로 붙잡지 않도록
+SESSION = requests.Session()
+SESSION.headers.update({"Connection": "keep-alive"})
+SESSION.mount("http://", HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(connect=2, read=0, status=0, backoff_factor=0.1)
+))
+
+# 오케스트레이터 헬스체크 결과 캐시 (프론트엔드 폴링이 매번 오케스트레이터를 호출하지 않도록)
+HEALTH_CACHE_TTL = 3.0  # 초
+_HEALTH_CACHE = {'t': 0.0, 'data': None}
+_health_cache_lock = threading.Lock()
+
+def get_orchestrator_health():
+    """
+    오케스트레이터 헬스체크 (성공 결과는 HEALTH_CACHE_TTL 동안 재사용)
+    
+    Returns:
+        (HTTP 상태 코드, 헬스체크 데이터)
+    """
+    with _health_cache_lock:
+        if _HEALTH_CACHE['data'] is not None and time.monotonic() - _HEALTH_CACHE['t'] < HEALTH_CACHE_TTL:
+            return 200, _HEALTH_CACHE['data']
+    
+    response = SESSION.get(f"{ORCHESTRATOR_API}/health", timeout=5)
+    if response.status_code != 200:
+        return response.status_code, None
+    
+    health_data = response.json()
+    with _health_cache_lock:
+        _HEALTH_CACHE['t'] = time.monotonic()
+        _HEALTH_CACHE['data'] = health_data
+    return 200, health_data
+
+# 오케스트레이터 상담 요청 타임아웃 (LLM 생성 포함)
+CONSULT_TIMEOUT = 60
+
+def request_consultation(question):
+    """오케스트레이터에 상담 요청 (/consult, /api/consult 공용)"""
+    return SESSION.post(
+        f"{ORCHESTRATOR_API}/consult",
+        json={"question": question},
+        headers={"Content-Type": "application/json"},
+        timeout=CONSULT_TIMEOUT
+    )
+
 @app.route('/')
 def index():
     """메인 페이지"""
@@ -52,7 +125,7 @@ def index():
         logger.info("🏠 메인 페이지 요청")
         return render_template('index.html')
     except Exception as e:
-        logger.error(f"❌ 메인 페이지 오류: {str(e)}")
+        logger.error("❌ 메인 페이지 오류: %s", e)
         return f"메인 페이지 오류: {str(e)}", 500
 
 @app.route('/health')
@@ -60,16 +133,15 @@ def health_check():
     """시스템 헬스체크 페이지"""
     try:
         # 오케스트레이터 헬스체크
-        response = requests.get(f"{ORCHESTRATOR_API}/health", timeout=5)
-        if response.status_code == 200:
-            health_data = response.json()
+        status_code, health_data = get_orchestrator_health()
+        if status_code == 200:
             return render_template('health.html', health_data=health_data, status="success")
         else:
             return render_template('health.html', 
-                                 health_data={"error": f"HTTP {response.status_code}"}, 
+                                 health_data={"error": f"HTTP {status_code}"}, 
                                  status="error")
     except Exception as e:
-        logger.error(f"헬스체크 실패: {e}")
+        logger.error("헬스체크 실패: %s", e)
         return render_template('health.html', 
                              health_data={"error": str(e)}, 
                              status="error")
@@ -86,24 +158,19 @@ def consultation():
             logger.info("💬 상담 페이지 POST 요청 시작")
             
             question = request.form.get('question', '').strip()
-            logger.info(f"📝 질문 내용: {question[:100]}...")
+            logger.info("📝 질문 내용: %s...", question[:100])
             
             if not question:
                 logger.warning("⚠️ 빈 질문 요청")
                 return render_template('consultation.html', 
                                      error="질문을 입력해주세요.")
             
-            logger.info(f"🚀 오케스트레이터로 요청 전송: {ORCHESTRATOR_API}/consult")
+            logger.info("🚀 오케스트레이터로 요청 전송: %s/consult", ORCHESTRATOR_API)
             
             # 오케스트레이터에게 상담 요청
-            response = requests.post(
-                f"{ORCHESTRATOR_API}/consult",
-                json={"question": question},
-                headers={"Content-Type": "application/json"},
-                timeout=60  # 1분 타임아웃
-            )
+            response = request_consultation(question)
             
-            logger.info(f"📡 오케스트레이터 응답: HTTP {response.status_code}")
+            logger.info("📡 오케스트레이터 응답: HTTP %s", response.status_code)
             
             if response.status_code == 200:
                 result = response.json()
@@ -113,18 +180,18 @@ def consultation():
                                      status="success")
             else:
                 error_msg = f"상담 요청 실패: HTTP {response.status_code} - {response.text}"
-                logger.error(f"❌ {error_msg}")
+                logger.error("❌ %s", error_msg)
                 return render_template('consultation.html', 
                                      error=error_msg)
                 
     except requests.exceptions.Timeout:
         error_msg = "상담 요청 시간이 초과되었습니다. 잠시 후 다시 시도해주세요."
-        logger.error(f"⏰ {error_msg}")
+        logger.error("⏰ %s", error_msg)
         return render_template('consultation.html', error=error_msg)
         
     except Exception as e:
         error_msg = f"상담 중 오류가 발생했습니다: {str(e)}"
-        logger.error(f"💥 상담 페이지 오류: {error_msg}")
+        logger.error("💥 상담 페이지 오류: %s", error_msg)
         return render_template('consultation.html', error=error_msg)
 
 @app.route('/api/consult', methods=['POST'])
@@ -137,69 +204,64 @@ def api_consultation():
         if request.is_json:
             data = request.get_json()
             question = data.get('question', '').strip() if data else ''
-            logger.info(f"📋 JSON 데이터 수신: {question[:50]}...")
+            logger.info("📋 JSON 데이터 수신: %s...", question[:50])
         else:
             question = request.form.get('question', '').strip()
-            logger.info(f"📋 Form 데이터 수신: {question[:50]}...")
+            logger.info("📋 Form 데이터 수신: %s...", question[:50])
         
         if not question:
             logger.warning("⚠️ 빈 질문 API 요청")
             return jsonify({"error": "질문을 입력해주세요."}), 400
         
-        logger.info(f"🚀 오케스트레이터로 API 요청 전송: {ORCHESTRATOR_API}/consult")
+        logger.info("🚀 오케스트레이터로 API 요청 전송: %s/consult", ORCHESTRATOR_API)
         
         # 오케스트레이터에게 상담 요청
-        response = requests.post(
-            f"{ORCHESTRATOR_API}/consult",
-            json={"question": question},
-            headers={"Content-Type": "application/json"},
-            timeout=60
-        )
+        response = request_consultation(question)
         
-        logger.info(f"📡 오케스트레이터 API 응답: HTTP {response.status_code}")
+        logger.info("📡 오케스트레이터 API 응답: HTTP %s", response.status_code)
         
         if response.status_code == 200:
-            result = response.json()
             logger.info("✅ API 상담 결과 수신 성공")
-            return jsonify(result)
+            # 오케스트레이터 JSON을 다시 파싱/직렬화하지 않고 그대로 전달
+            return Response(response.content, status=200, mimetype='application/json')
         else:
             error_msg = f"상담 요청 실패: HTTP {response.status_code} - {response.text}"
-            logger.error(f"❌ {error_msg}")
+            logger.error("❌ %s", error_msg)
             return jsonify({"error": error_msg}), 500
             
     except requests.exceptions.Timeout:
         error_msg = "상담 요청 시간이 초과되었습니다."
-        logger.error(f"⏰ API {error_msg}")
+        logger.error("⏰ API %s", error_msg)
         return jsonify({"error": error_msg}), 504
     except Exception as e:
         error_msg = f"상담 중 오류 발생: {str(e)}"
-        logger.error(f"💥 API 상담 실패: {error_msg}")
+        logger.error("💥 API 상담 실패: %s", error_msg)
         return jsonify({"error": error_msg}), 500
 
 @app.route('/api/progress/<consultation_id>')
 def get_progress(consultation_id):
     """상담 진행 상황 조회 API"""
     try:
-        response = requests.get(f"{ORCHESTRATOR_API}/progress/{consultation_id}", timeout=5)
+        response = SESSION.get(f"{ORCHESTRATOR_API}/progress/{consultation_id}", timeout=5)
         if response.status_code == 200:
-            return jsonify(response.json())
+            return Response(response.content, status=200, mimetype='application/json')
         else:
             return jsonify({"error": "진행 상황을 찾을 수 없습니다."}), 404
     except Exception as e:
-        logger.error(f"진행 상황 조회 실패: {e}")
+        logger.error("진행 상황 조회 실패: %s", e)
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/health')
 def api_health():
     """API 헬스체크"""
     try:
-        response = requests.get(f"{ORCHESTRATOR_API}/health", timeout=5)
-        if response.status_code == 200:
-            return jsonify(response.json())
+        status_code, health_data = get_orchestrator_health()
+        if status_code == 200:
+            return jsonify(health_data)
         else:
-            return jsonify({"error": f"HTTP {response.status_code}"}), 500
+            return jsonify({"error": f"HTTP {status_code}"}), 500
     except Exception as e:
-        logger.error(f"API 헬스체크 실패: {e}")
+        logger.error("API 헬스체크 실패: %s", e)
         return jsonify({"error": str(e)}), 500
 
 @app.route('/result', methods=['GET', 'POST'])
@@ -218,7 +280,7 @@ def result():
                                          consultation_result=consultation_result, 
                                          status="success")
                 except json.JSONDecodeError as e:
-                    logger.error(f"❌ JSON 파싱 오류: {str(e)}")
+                    logger.error("❌ JSON 파싱 오류: %s", e)
                     return render_template('result.html', 
                                          consultation_result=None, 
                                          status="error", 
@@ -234,7 +296,7 @@ def result():
                              message="상담 결과를 찾을 수 없습니다. 새로운 상담을 진행해주세요.")
                              
     except Exception as e:
-        logger.error(f"❌ 결과 페이지 오류: {str(e)}")
+        logger.error("❌ 결과 페이지 오류: %s", e)
         return f"결과 페이지 오류: {str(e)}", 500
 
 @app.route('/about')
@@ -245,14 +307,14 @@ def about():
 # 에러 핸들러
 @app.errorhandler(404)
 def not_found(error):
-    logger.error(f"🔍 404 오류: {request.url} 페이지를 찾을 수 없음")
+    logger.error("🔍 404 오류: %s 페이지를 찾을 수 없음", request.url)
     return render_template('error.html', 
                          error_code=404, 
                          error_message="페이지를 찾을 수 없습니다."), 404
 
 @app.errorhandler(500)
 def internal_error(error):
-    logger.error(f"💥 500 오류: 내부 서버 오류 - {str(error)}")
+    logger.error("💥 500 오류: 내부 서버 오류 - %s", error)
     return render_template('error.html', 
                          error_code=500, 
                          error_message="내부 서버 오류가 발생했습니다."), 500
@@ -275,27 +337,38 @@ def truncate_words(text, max_words=50):
         return ' '.join(words[:max_words]) + '...'
     return text
 
+# 마크다운 변환기 확장 목록과 이모지 패턴은 import 시 한 번만 준비
+_MD_EXTENSIONS = [
+    'tables',           # 테이블 지원
+    'fenced_code',      # 코드 블록 지원
+    'nl2br',           # 줄바꿈을 <br>로 변환
+    'sane_lists'       # 리스트 개선
+]
+# 이모지를 <span class="emoji">로 감싸는 변환 (정규식 콜백 대신 C 수준 문자열 치환)
+# ⚠️는 두 코드포인트(U+26A0 U+FE0F)라 번역 테이블 대신 replace로 처리
+_EMOJI_TABLE = str.maketrans({c: f'<span class="emoji">{c}</span>' for c in "📋🏥💡🔍📊🎯"})
+_WARNING_EMOJI = '⚠️'
+_WARNING_EMOJI_SPAN = f'<span class="emoji">{_WARNING_EMOJI}</span>'
+# Markdown 인스턴스는 스레드 안전하지 않으므로 Waitress 워커 스레드별로 하나씩 재사용
+_md_local = threading.local()
+
+def _get_markdown():
+    md = getattr(_md_local, 'md', None)
+    if md is None:
+        md = _md_local.md = markdown.Markdown(extensions=_MD_EXTENSIONS)
+    return md
+
 @app.template_filter('markdown')
 def markdown_filter(text):
     """마크다운을 HTML로 변환하는 필터"""
     if not text:
         return ''
     
-    # 마크다운을 HTML로 변환
-    md = markdown.Markdown(
-        extensions=[
-            'tables',           # 테이블 지원
-            'fenced_code',      # 코드 블록 지원
-            'nl2br',           # 줄바꿈을 <br>로 변환
-            'sane_lists'       # 리스트 개선
-        ]
-    )
-    
     # 이모지와 특수 문자 처리
-    text = re.sub(r'📋|🏥|⚠️|💡|🔍|📊|🎯', lambda m: f'<span class="emoji">{m.group()}</span>', text)
+    text = text.translate(_EMOJI_TABLE).replace(_WARNING_EMOJI, _WARNING_EMOJI_SPAN)
     
-    # 마크다운 변환 실행
-    html_content = md.convert(text)
+    # 마크다운 변환 실행 (이전 변환 상태 초기화 후)
+    html_content = _get_markdown().reset().convert(text)
     
     return html_content
 
@@ -312,5 +385,7 @@ if __name__ == '__main__':
         print(f"  • {rule.methods} {rule.rule}")
     
     # Waitress WSGI 서버 사용
+    # 상담 요청은 LLM 생성 동안 워커 스레드를 점유하므로 기본값(4)보다 넉넉하게 설정해
+    # 느린 상담 몇 건이 헬스체크/진행 상황 조회까지 막지 않도록 함
     from waitress import serve
-    serve(app, host='0.0.0.0', port=8000)
\ No newline at end of file
+    serve(app, host='0.0.0.0', port=8000, threads=int(os.getenv("WEB_THREADS", 16)))
\ No newline at end of file